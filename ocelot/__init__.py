@@ -17,11 +17,63 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from .core import *
-from .constants import *
-#from .wavefunction import *
-#from .visualization import *
-#from .materuals import *
-#from .quantumcircuits import *
+'''
+  Ocelot package. Submodules, constants and the classes below are imported on first access (PEP 562),
+  so "import ocelot" does not load numpy, pandas or scipy until they are needed.
+'''
+
+from importlib import import_module
 
 __version__ = "0.0.7"
+
+# public names -> submodule defining them
+_lazy_names = {
+    'element_list': 'constants',
+    'atomic_number': 'constants',
+    'covalent_radius': 'constants',
+    'vdW_radius': 'constants',
+    'atomic_mass': 'constants',
+    'electronegativity': 'constants',
+    'element_symbols': 'constants',
+    'element_labels': 'constants',
+    'symbols_to_numbers': 'constants',
+    'numbers_to_symbols': 'constants',
+    'bohr_radius': 'constants',
+    'hartree': 'constants',
+    'coulomb_constant': 'constants',
+    'cached': 'core',
+    'Atom': 'core',
+    'AtomArrays': 'core',
+    'Chemical': 'core',
+    'Molecule': 'core',
+    'Material': 'core',
+    'save_structures': 'core',
+    'load_structures': 'core',
+    'Archive': 'archive',
+    'NeighborList': 'neighbors',
+    'Topology': 'topology',
+    'Trajectory': 'trajectory',
+    'XdatcarTrajectory': 'trajectory',
+}
+
+# "from ocelot import *" resolves these through __getattr__
+__all__ = sorted(_lazy_names)
+
+_submodules = ['analysis', 'archive', 'batch', 'constants', 'core', 'electrostatics', 'fileio', 'fingerprint',
+               'fourier', 'materials', 'neighbors', 'pseudopotential', 'quantumcircuits', 'topology', 'trajectory',
+               'visualizations', 'wavefunction']
+
+
+def __getattr__(name):
+    if name in _lazy_names:
+        value = getattr(import_module('.' + _lazy_names[name], __name__), name)
+    elif name in _submodules:
+        value = import_module('.' + name, __name__)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_names) | set(_submodules))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# file: __main__.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Batch analysis of xyz files:
+
+      python -m ocelot molecules/ -o summary.csv
+      python -m ocelot molecules/ --task bonds -o bonds.parquet --processes 16
+'''
+
+import argparse
+import sys
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog='python -m ocelot', description='Analyze many xyz files in parallel.')
+    parser.add_argument('paths', nargs='+', help='xyz files or directories (searched recursively)')
+    parser.add_argument('-o', '--output', default=None,
+                        help='output file (.csv, .parquet or .npz); CSV to standard output by default')
+    parser.add_argument('-t', '--task', default='summary', choices=['summary', 'bonds', 'angles', 'dihedrals'])
+    parser.add_argument('-p', '--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=64, help='files per task submitted to a worker')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='bond length tolerance')
+    parser.add_argument('--pattern', default='*.xyz', help='file pattern searched in directories')
+    parser.add_argument('--quiet', action='store_true', help='do not report progress')
+    options = parser.parse_args(arguments)
+
+    from .batch import find_files, run_batch
+    files = find_files(options.paths, options.pattern)
+    output = sys.stdout if options.output is None else options.output
+    result = run_batch(files, output, task=options.task, tolerance=options.tolerance,
+                       processes=options.processes, chunk_size=options.chunk_size,
+                       report=None if options.quiet else sys.stderr)
+    for filename, message in result['errors']:
+        sys.stderr.write("{}: {}\n".format(filename, message))
+    return 1 if result['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
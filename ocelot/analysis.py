@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# file: analysis.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module analysis
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .constants import symbols_to_numbers
+from .core import Material
+from .neighbors import pairs_within, periodic_pairs
+
+
+def pair_distances(chemical, cutoff):
+    '''
+        Return arrays (i, j, distance) with every pair of atoms closer than cutoff listed once.
+        For a Material, pairs with periodic images are included.
+    '''
+    if isinstance(chemical, Material):
+        i, j, images, vectors = periodic_pairs(chemical.cartesian_coordinates(), cutoff, chemical.bravais_lattice)
+    else:
+        coordinates = chemical.coordinates
+        i, j = pairs_within(coordinates, cutoff, sort=False)
+        vectors = coordinates[j] - coordinates[i]
+    return i, j, np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+
+
+def accumulate_frames(trajectory_class, filename, index_file, rmax, bins, start, stop, step):
+    '''
+        Accumulate frames start:stop:step of a trajectory file into a new RadialDistribution
+        (process pool worker).
+    '''
+    distribution = RadialDistribution(rmax, bins)
+    distribution.update(trajectory_class(filename, index_file).frames(start, stop, step))
+    return distribution
+
+
+class RadialDistribution(object):
+    '''
+        Streaming accumulator of radial distribution functions g(r), partial g_ab(r) and
+        coordination numbers n_ab(r), for Molecule or (periodic) Material frames.
+
+        Only pair distance histograms (per ordered element pair) and normalization sums are stored,
+        so memory does not grow with the number of frames. Accumulators can be merged, and frames of a
+        trajectory file can be split across a process pool:
+
+            rdf = RadialDistribution(rmax=8.0, bins=400)
+            rdf.accumulate(Trajectory('md.xyz'), processes=8)
+            r, g = rdf.radii, rdf.rdf('O', 'H')
+            n = rdf.coordination('O', 'H')
+
+        The density of a Molecule frame uses the volume of its molecule_box() unless a volume is given.
+    '''
+    def __init__(self, rmax=10.0, bins=200):
+        '''
+            RadialDistribution object constructor.
+        '''
+        self.__rmax = float(rmax)
+        self.__bins = int(bins)
+        self.__frames = 0
+        self.__counts = {}
+        self.__pair_density = {}
+        self.__centers = {}
+        self.__total_density = 0.0
+
+    @property
+    def rmax(self):
+        return self.__rmax
+
+    @property
+    def bins(self):
+        return self.__bins
+
+    @property
+    def frames(self):
+        return self.__frames
+
+    @property
+    def edges(self):
+        return np.linspace(0.0, self.__rmax, self.__bins + 1)
+
+    @property
+    def radii(self):
+        '''
+            Centers of the histogram bins.
+        '''
+        edges = self.edges
+        return 0.5 * (edges[1:] + edges[:-1])
+
+    @property
+    def pairs(self):
+        '''
+            Ordered element pairs (Z_a, Z_b) found so far.
+        '''
+        return sorted(self.__counts)
+
+    def add(self, chemical, volume=None):
+        '''
+            Add the pair distances of one frame to the histograms.
+        '''
+        periodic = isinstance(chemical, Material)
+        if volume is None:
+            if periodic:
+                volume = abs(np.linalg.det(chemical.bravais_lattice))
+            else:
+                volume = abs(np.linalg.det(chemical.molecule_box()))
+        elements = np.asarray(chemical.elements)
+        species, inverse = np.unique(elements, return_inverse=True)
+        numbers = np.bincount(inverse, minlength=species.shape[0])
+        s = species.shape[0]
+
+        i, j, distances = pair_distances(chemical, self.__rmax)
+        keep = (distances > 0.0) & (distances < self.__rmax)
+        i, j = inverse[i[keep]], inverse[j[keep]]
+        bins = np.minimum((distances[keep] * (self.__bins / self.__rmax)).astype(np.int64), self.__bins - 1)
+        # each pair counts once from each side (a -> b and b -> a)
+        size = s * s * self.__bins
+        counts = (np.bincount((i * s + j) * self.__bins + bins, minlength=size)
+                  + np.bincount((j * s + i) * self.__bins + bins, minlength=size)).reshape(s, s, self.__bins)
+
+        for a in range(s):
+            za = int(species[a])
+            self.__centers[za] = self.__centers.get(za, 0) + int(numbers[a])
+            for b in range(s):
+                key = (za, int(species[b]))
+                if key not in self.__counts:
+                    self.__counts[key] = np.zeros(self.__bins, dtype=np.int64)
+                    self.__pair_density[key] = 0.0
+                self.__counts[key] += counts[a, b]
+                self.__pair_density[key] += numbers[a] * (numbers[b] - (a == b and not periodic)) / volume
+        # periodic images of an atom are neighbors too: N*N pairs per volume, instead of N*(N-1)
+        number_of_atoms = elements.shape[0]
+        self.__total_density += number_of_atoms * (number_of_atoms - (not periodic)) / volume
+        self.__frames += 1
+
+    def update(self, chemicals):
+        '''
+            Add every frame of an iterable of Molecule/Material objects.
+        '''
+        for chemical in chemicals:
+            self.add(chemical)
+        return self
+
+    def merge(self, other):
+        '''
+            Add the histograms of another accumulator (with the same rmax and bins) to this one.
+        '''
+        if other.rmax != self.__rmax or other.bins != self.__bins:
+            raise Exception("Cannot merge radial distributions with different bins.")
+        for key, counts in other.histograms().items():
+            if key not in self.__counts:
+                self.__counts[key] = np.zeros(self.__bins, dtype=np.int64)
+                self.__pair_density[key] = 0.0
+            self.__counts[key] += counts
+        for key, density in other.pair_densities().items():
+            self.__pair_density[key] += density
+        for key, number in other.center_counts().items():
+            self.__centers[key] = self.__centers.get(key, 0) + number
+        self.__total_density += other.total_density()
+        self.__frames += other.frames
+        return self
+
+    def histograms(self):
+        return self.__counts
+
+    def pair_densities(self):
+        return self.__pair_density
+
+    def center_counts(self):
+        return self.__centers
+
+    def total_density(self):
+        return self.__total_density
+
+    def accumulate(self, trajectory, processes=None, start=0, stop=None, step=1, chunk_size=None):
+        '''
+            Add frames start:stop:step of a Trajectory (or any iterable of frames, without processes).
+            With processes > 1, contiguous chunks of frames are read and histogrammed by a process pool
+            and the partial histograms are merged.
+        '''
+        if processes is None or processes == 1:
+            frames = trajectory.frames(start, stop, step) if hasattr(trajectory, 'frames') else trajectory
+            return self.update(frames)
+
+        indices = range(*slice(start, stop, step).indices(len(trajectory)))
+        if chunk_size is None:
+            chunk_size = max(1, len(indices) // (4 * processes))
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(accumulate_frames, type(trajectory), trajectory.filename,
+                                       trajectory.index_file, self.__rmax, self.__bins,
+                                       chunk.start, chunk.stop, chunk.step)
+                       for chunk in (indices[k:k + chunk_size] for k in range(0, len(indices), chunk_size))]
+            for future in futures:
+                self.merge(future.result())
+        return self
+
+    def __key(self, element):
+        return int(symbols_to_numbers(element)) if isinstance(element, str) else int(element)
+
+    def rdf(self, a=None, b=None):
+        '''
+            Radial distribution function g(r) at the bin centers: the total g(r) if a and b are None,
+            else the partial g_ab(r) (elements as symbols or atomic numbers).
+        '''
+        edges = self.edges
+        shells = 4.0 / 3.0 * np.pi * (edges[1:]**3 - edges[:-1]**3)
+        if a is None and b is None:
+            counts = sum(self.__counts.values()) if self.__counts else np.zeros(self.__bins)
+            density = self.__total_density
+        else:
+            key = (self.__key(a), self.__key(b))
+            counts = self.__counts.get(key, np.zeros(self.__bins))
+            density = self.__pair_density.get(key, 0.0)
+        if density == 0.0:
+            return np.zeros(self.__bins)
+        return counts / (density * shells)
+
+    def coordination(self, a, b):
+        '''
+            Running coordination number n_ab(r): average number of b atoms within r of an a atom,
+            at the upper bin edges.
+        '''
+        key = (self.__key(a), self.__key(b))
+        centers = self.__centers.get(key[0], 0)
+        if centers == 0:
+            return np.zeros(self.__bins)
+        return np.cumsum(self.__counts.get(key, np.zeros(self.__bins))) / centers
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# file: archive.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module archive
+
+  Binary format to store one or many structures:
+
+      magic (8 bytes) | header size (uint64, little endian) | JSON header | raw arrays
+
+  The JSON header is an index with one entry per structure: name, class name ("kind"),
+  constructor parameters, and dtype, shape and byte offset of each array. Arrays are
+  aligned to 64 bytes, so they can be memory mapped directly.
+'''
+
+import json
+import numpy as np
+
+MAGIC = b'OCELOT\x00\x01'
+ALIGNMENT = 64
+
+
+def aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def json_value(value):
+    '''
+        Convert numpy scalars and arrays in constructor parameters to JSON types.
+    '''
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError("Object of type {} is not JSON serializable.".format(type(value).__name__))
+
+
+def write_archive(filename, records, names=None):
+    '''
+        Write records (kind, parameters, arrays dictionary) to filename.
+    '''
+    records = list(records)
+    if names is None:
+        names = [str(index) for index in range(len(records))]
+    names = list(names)
+    if len(names) != len(records):
+        raise Exception("Got {} names for {} structures.".format(len(names), len(records)))
+
+    entries = []
+    offset = 0
+    for name, (kind, parameters, arrays) in zip(names, records):
+        arrays_index = {}
+        for key, array in arrays.items():
+            array = np.asarray(array)
+            arrays_index[key] = {'dtype': array.dtype.newbyteorder('<').str, 'shape': list(array.shape),
+                                 'offset': offset}
+            offset = aligned(offset + array.nbytes)
+        entries.append({'name': name, 'kind': kind, 'parameters': parameters, 'arrays': arrays_index})
+
+    header = json.dumps({'version': 1, 'structures': entries}, default=json_value).encode('utf-8')
+    data_start = aligned(len(MAGIC) + 8 + len(header))
+    with open(filename, 'wb') as stream:
+        stream.write(MAGIC)
+        stream.write(np.uint64(len(header)).astype('<u8').tobytes())
+        stream.write(header)
+        for (kind, parameters, arrays), entry in zip(records, entries):
+            for key, array in arrays.items():
+                stream.seek(data_start + entry['arrays'][key]['offset'])
+                array = np.ascontiguousarray(array, dtype=entry['arrays'][key]['dtype'])
+                stream.write(array.tobytes())
+        stream.truncate(data_start + offset)
+
+
+class Archive(object):
+    '''
+        Index of an archive file. Only the header is read when the object is created;
+        arrays of each structure are read (or memory mapped) on demand.
+    '''
+    def __init__(self, filename):
+        '''
+            Archive object constructor.
+        '''
+        self.__filename = filename
+        with open(filename, 'rb') as stream:
+            if stream.read(len(MAGIC)) != MAGIC:
+                raise Exception("{} is not an ocelot archive.".format(filename))
+            header_size = int(np.frombuffer(stream.read(8), dtype='<u8')[0])
+            header = json.loads(stream.read(header_size).decode('utf-8'))
+        self.__entries = header['structures']
+        self.__data_start = aligned(len(MAGIC) + 8 + header_size)
+
+    @property
+    def filename(self):
+        return self.__filename
+
+    @property
+    def names(self):
+        return [entry['name'] for entry in self.__entries]
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def record(self, index, mmap=True):
+        '''
+            Return record (kind, parameters, arrays) of structure "index" (position or name).
+            With mmap=True, arrays are copy-on-write memory maps of the file.
+        '''
+        if isinstance(index, str):
+            index = self.names.index(index)
+        entry = self.__entries[index]
+        arrays = {}
+        for key, array_index in entry['arrays'].items():
+            dtype = np.dtype(array_index['dtype'])
+            shape = tuple(array_index['shape'])
+            offset = self.__data_start + array_index['offset']
+            if mmap and np.prod(shape) > 0:
+                arrays[key] = np.memmap(self.__filename, dtype=dtype, mode='c', offset=offset, shape=shape)
+            else:
+                with open(self.__filename, 'rb') as stream:
+                    stream.seek(offset)
+                    count = int(np.prod(shape))
+                    arrays[key] = np.fromfile(stream, dtype=dtype, count=count).reshape(shape)
+        return entry['kind'], entry['parameters'], arrays
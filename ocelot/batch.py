@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# file: batch.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module batch
+'''
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import glob
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from .constants import element_symbols
+from .core import Molecule
+
+
+def summary_table(molecule, tolerance=0.2):
+    '''
+        One row with the number of atoms, chemical formula, number of bonds and angles, and mean bond length.
+    '''
+    bonds = molecule.bonds(tolerance)
+    species, counts = np.unique(molecule.elements, return_counts=True)
+    symbols = dict(zip(element_symbols[species].tolist(), counts))
+    # Hill notation: C and H first (if there is carbon), then alphabetical order
+    order = sorted(symbols, key=lambda symbol: (('C', 'H').index(symbol) if 'C' in symbols and symbol in ('C', 'H')
+                                                else 2, symbol))
+    formula = ''.join('{}{}'.format(symbol, symbols[symbol] if symbols[symbol] > 1 else '') for symbol in order)
+    return pd.DataFrame({'atoms': [len(molecule)],
+                         'formula': [formula],
+                         'bonds': [len(bonds)],
+                         'angles': [len(molecule.angles(tolerance))],
+                         'mean bond length': [bonds['distance'].mean() if len(bonds) else np.nan]})
+
+
+def bonds_table(molecule, tolerance=0.2):
+    return molecule.bonds(tolerance).drop(columns=['direction'])
+
+
+def angles_table(molecule, tolerance=0.2):
+    return molecule.angles(tolerance).drop(columns=['normal'])
+
+
+def dihedrals_table(molecule, tolerance=0.2):
+    return molecule.dihedral_angles(tolerance)
+
+
+# Batch tasks: functions of (molecule, tolerance) returning a dataframe with scalar columns
+tasks = {'summary': summary_table, 'bonds': bonds_table, 'angles': angles_table, 'dihedrals': dihedrals_table}
+
+
+def find_files(paths, pattern='*.xyz'):
+    '''
+        Expand a list of files and directories (searched recursively for pattern) into a sorted list of files.
+    '''
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '**', pattern), recursive=True))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def process_files(filenames, task='summary', tolerance=0.2):
+    '''
+        Read each xyz file and apply task (process pool worker).
+        Return a dataframe (with a 'filename' column) and a list of (file, error message) for failed files.
+    '''
+    frames, errors = [], []
+    for filename in filenames:
+        try:
+            molecule = Molecule()
+            molecule.from_xyz(filename)
+            frame = tasks[task](molecule, tolerance)
+        except Exception as error:
+            errors.append((filename, str(error)))
+            continue
+        frame.insert(0, 'filename', filename)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(), errors
+    return pd.concat(frames, ignore_index=True), errors
+
+
+class ResultWriter(object):
+    '''
+        Columnar output of batch results, written chunk by chunk: CSV (streamed, also to a stream
+        such as sys.stdout), Parquet (streamed, requires pyarrow) or NPZ (one array per column,
+        written when the writer is closed).
+        The output is created even if no rows are written, with the given columns (if any).
+    '''
+    def __init__(self, destination, format=None, columns=None):
+        '''
+            ResultWriter object constructor. By default, the format is taken from the file extension.
+        '''
+        if format is None:
+            extension = os.path.splitext(destination)[1].lower() if isinstance(destination, str) else '.csv'
+            format = {'.csv': 'csv', '.parquet': 'parquet', '.npz': 'npz'}.get(extension)
+        if format not in ('csv', 'parquet', 'npz'):
+            raise Exception("Unknown output format for {}. Use csv, parquet or npz.".format(destination))
+        self.__destination = destination
+        self.__format = format
+        self.__rows = 0
+        self.__stream = None
+        self.__columns = {}
+        self.__names = [] if columns is None else list(columns)
+
+    @property
+    def format(self):
+        return self.__format
+
+    @property
+    def rows(self):
+        return self.__rows
+
+    def write(self, frame):
+        '''
+            Append the rows of a dataframe.
+        '''
+        if len(frame) == 0:
+            return
+        self.__append(frame)
+        self.__rows += len(frame)
+
+    def __append(self, frame):
+        if self.__format == 'csv':
+            if self.__stream is None:
+                owned = isinstance(self.__destination, str)
+                self.__stream = open(self.__destination, 'w', newline='') if owned else self.__destination
+                frame.to_csv(self.__stream, index=False)
+            else:
+                frame.to_csv(self.__stream, index=False, header=False)
+        elif self.__format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise Exception("Parquet output requires pyarrow.")
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if self.__stream is None:
+                self.__stream = pyarrow.parquet.ParquetWriter(self.__destination, table.schema)
+            self.__stream.write_table(table)
+        else:
+            for column in frame.columns:
+                self.__columns.setdefault(column, []).append(frame[column].to_numpy())
+
+    def close(self):
+        if self.__rows == 0:
+            # no rows: create the output anyway (only a header, or empty columns)
+            self.__append(pd.DataFrame({column: np.zeros(0) for column in self.__names}))
+        if self.__format == 'npz':
+            columns = {}
+            for column, chunks in self.__columns.items():
+                values = np.concatenate(chunks)
+                # strings as fixed-width unicode, so the archive loads without pickle
+                columns[column] = values.astype(str) if values.dtype == object else values
+            np.savez(self.__destination, **columns)
+            self.__columns = {}
+        elif self.__stream is not None and (self.__format == 'parquet' or isinstance(self.__destination, str)):
+            self.__stream.close()
+        elif self.__stream is not None:
+            self.__stream.flush()
+        self.__stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def run_batch(files, output, task='summary', tolerance=0.2, processes=None, chunk_size=64, format=None,
+              report=sys.stderr, report_interval=5.0):
+    '''
+        Apply task to every xyz file over a process pool and stream the results to output.
+
+        Files are submitted in chunks of chunk_size, with at most 2*processes chunks in flight, and the
+        results of each chunk are written as soon as it completes (rows are grouped by chunk, in
+        completion order). Progress and throughput are written to report every report_interval seconds
+        (report=None disables it). Return a dict with the number of files, rows, errors and elapsed time.
+    '''
+    if task not in tasks:
+        raise Exception("Unknown task {}. Use one of {}.".format(task, sorted(tasks)))
+    files = list(files)
+    chunks = [files[k:k + chunk_size] for k in range(0, len(files), chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    start = time.perf_counter()
+    last_report = start
+    done, errors = 0, []
+
+    try:
+        # columns of the task output, for a header even if every file fails
+        columns = ['filename'] + list(tasks[task](Molecule(), tolerance).columns)
+    except Exception:
+        columns = None
+
+    with ResultWriter(output, format, columns) as writer, ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = {}
+        queue = iter(chunks)
+        while True:
+            for chunk in queue:
+                pending[executor.submit(process_files, chunk, task, tolerance)] = len(chunk)
+                if len(pending) >= 2 * processes:
+                    break
+            if not pending:
+                break
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                frame, chunk_errors = future.result()
+                writer.write(frame)
+                errors.extend(chunk_errors)
+                done += pending.pop(future)
+            now = time.perf_counter()
+            if report is not None and now - last_report >= report_interval:
+                report.write("{}/{} files, {:.1f} files/s\n".format(done, len(files), done / (now - start)))
+                last_report = now
+        rows = writer.rows
+
+    elapsed = time.perf_counter() - start
+    if report is not None:
+        report.write("{} files ({} errors), {} rows in {:.2f} s ({:.1f} files/s)\n".format(
+            done, len(errors), rows, elapsed, done / elapsed if elapsed > 0 else 0.0))
+    return {'files': done, 'rows': rows, 'errors': errors, 'seconds': elapsed}
@@ -21,6 +21,8 @@
   Module constants 
 '''
 
+import numpy as np
+
 # Periodic table list
 # Example: element[79] => 'Au'
 element_list = [' ', 'H ', 'He', 'Li', 'Be', 'B ', 'C ', 'N ', 'O ', 'F ', 'Ne',
@@ -51,21 +53,130 @@ atomic_number = {'H': 1,  'He': 2,  'Li': 3,  'Be': 4,   'B': 5,   'C': 6,   'N'
                'Md':101, 'No':102, 'Lr':103, 'Rf':104, 'Db':105, 'Sg':106, 'Bh':107, 'Hs':108, 'Mt':109, 'Ds':110,
                'Rg':111, 'Cn':112, 'Nh':113, 'Fl':114, 'Mc':115, 'Lv':116, 'Ts':117, 'Og':118} 
 
-# Covalent radii (in Angstrom) from Cambridge Structural Database
+# Covalent radii (in Angstrom) from Cambridge Structural Database [Dalton Trans. 2832 (2008)],
+# completed for Z = 97-118 with the single-bond radii of Pyykko and Atsumi [Chem. Eur. J. 15, 186 (2009)].
 # Example: covalent_radius[8] => 0.66
-covalent_radius = [0, 0.31, 0.28, 1.28, 0.96, 0.84, 0.73, 0.71, 0.66, 0.57, 0.58,
-                      1.66, 1.41, 1.21, 1.11, 1.07, 1.05, 1.02, 1.06, 2.03, 1.76,
-                      1.70, 1.60, 1.53, 1.39, 1.39, 1.32, 1.26, 1.24, 1.32, 1.22,
-                      1.22, 1.20, 1.19, 1.20, 1.20, 1.16, 2.20, 1.95, 1.90, 1.75,
-                      1.64, 1.54, 1.47, 1.46, 1.42, 1.39, 1.45, 1.44, 1.42, 1.39,
-                      1.39, 1.38, 1.39, 1.40, 2.44, 2.15, 2.07, 2.04, 2.03, 2.01,
-                      1.99, 1.98, 1.98, 1.96, 1.94, 1.92, 1.92, 1.89, 1.90, 1.87,
-                      1.75, 1.87, 1.70, 1.62, 1.51, 1.44, 1.41, 1.36, 1.36, 1.32,
-                      1.45, 1.46, 1.48, 1.40, 1.50, 1.50, 2.60, 2.21, 2.15, 2.06,
-                      2.00, 1.96, 1.90, 1.87, 1.80, 1.69]
-
-# van der Waals radii (in Angstrom). Incomplete data.
+covalent_radius = np.array([0, 0.31, 0.28, 1.28, 0.96, 0.84, 0.73, 0.71, 0.66, 0.57, 0.58,
+                               1.66, 1.41, 1.21, 1.11, 1.07, 1.05, 1.02, 1.06, 2.03, 1.76,
+                               1.70, 1.60, 1.53, 1.39, 1.39, 1.32, 1.26, 1.24, 1.32, 1.22,
+                               1.22, 1.20, 1.19, 1.20, 1.20, 1.16, 2.20, 1.95, 1.90, 1.75,
+                               1.64, 1.54, 1.47, 1.46, 1.42, 1.39, 1.45, 1.44, 1.42, 1.39,
+                               1.39, 1.38, 1.39, 1.40, 2.44, 2.15, 2.07, 2.04, 2.03, 2.01,
+                               1.99, 1.98, 1.98, 1.96, 1.94, 1.92, 1.92, 1.89, 1.90, 1.87,
+                               1.75, 1.87, 1.70, 1.62, 1.51, 1.44, 1.41, 1.36, 1.36, 1.32,
+                               1.45, 1.46, 1.48, 1.40, 1.50, 1.50, 2.60, 2.21, 2.15, 2.06,
+                               2.00, 1.96, 1.90, 1.87, 1.80, 1.69, 1.68, 1.68, 1.65, 1.67,
+                               1.73, 1.76, 1.61, 1.57, 1.49, 1.43, 1.41, 1.34, 1.29, 1.28,
+                               1.21, 1.22, 1.36, 1.43, 1.62, 1.75, 1.65, 1.57])
+
+# van der Waals radii (in Angstrom) from Bondi [J. Phys. Chem. 68, 441 (1964)] and Mantina et al.
+# [J. Phys. Chem. A 113, 5806 (2009)], completed with Alvarez [Dalton Trans. 42, 8617 (2013)]
+# for the transition metals, lanthanides and actinides up to Es. NaN for Pm and Z >= 100 (no data).
 # Example: vdW_radius[3] => 1.82
-vdW_radius = [0, 1.20, 1.40, 1.82, 1.53, 1.92, 1.70, 1.55, 1.52, 1.47, 1.54,
-                 2.27, 1.73, 1.84, 2.10, 1.80, 1.80, 1.75, 1.88, 2.75, 2.31,
-                 2.11, 1.63, 1.40, 1.39]
+nan = np.nan
+vdW_radius = np.array([nan,  1.20, 1.40, 1.82, 1.53, 1.92, 1.70, 1.55, 1.52, 1.47, 1.54,
+                       2.27, 1.73, 1.84, 2.10, 1.80, 1.80, 1.75, 1.88, 2.75, 2.31,
+                       2.58, 2.46, 2.42, 2.45, 2.45, 2.44, 2.40, 1.63, 1.40, 1.39,
+                       1.87, 2.11, 1.85, 1.90, 1.85, 2.02, 3.03, 2.49, 2.75, 2.52,
+                       2.56, 2.45, 2.44, 2.46, 2.44, 1.63, 1.72, 1.58, 1.93, 2.17,
+                       2.06, 2.06, 1.98, 2.16, 3.43, 2.68, 2.98, 2.88, 2.92, 2.95,
+                       nan,  2.90, 2.87, 2.83, 2.79, 2.87, 2.81, 2.83, 2.79, 2.80,
+                       2.74, 2.63, 2.53, 2.57, 2.49, 2.48, 2.41, 1.75, 1.66, 1.55,
+                       1.96, 2.02, 2.07, 1.97, 2.02, 2.20, 3.48, 2.83, 2.80, 2.93,
+                       2.88, 1.86, 2.82, 2.81, 2.83, 3.05, 3.40, 3.05, 2.70, nan,
+                       nan,  nan,  nan,  nan,  nan,  nan,  nan,  nan,  nan,  nan,
+                       nan,  nan,  nan,  nan,  nan,  nan,  nan,  nan])
+
+# Standard atomic weights (in atomic mass units, IUPAC). For elements without stable isotopes,
+# the mass number of the longest-lived isotope.
+# Example: atomic_mass[6] => 12.011
+atomic_mass = np.array([0.0, 1.008, 4.002602, 6.94, 9.0121831, 10.81, 12.011, 14.007, 15.999, 18.998403163, 20.1797,
+                        22.98976928, 24.305, 26.9815385, 28.085, 30.973761998, 32.06, 35.45, 39.948, 39.0983, 40.078,
+                        44.955908, 47.867, 50.9415, 51.9961, 54.938044, 55.845, 58.933194, 58.6934, 63.546, 65.38,
+                        69.723, 72.630, 74.921595, 78.971, 79.904, 83.798, 85.4678, 87.62, 88.90584, 91.224,
+                        92.90637, 95.95, 98.0, 101.07, 102.90550, 106.42, 107.8682, 112.414, 114.818, 118.710,
+                        121.760, 127.60, 126.90447, 131.293, 132.90545196, 137.327, 138.90547, 140.116, 140.90766, 144.242,
+                        145.0, 150.36, 151.964, 157.25, 158.92535, 162.500, 164.93033, 167.259, 168.93422, 173.045,
+                        174.9668, 178.49, 180.94788, 183.84, 186.207, 190.23, 192.217, 195.084, 196.966569, 200.592,
+                        204.38, 207.2, 208.98040, 209.0, 210.0, 222.0, 223.0, 226.0, 227.0, 232.0377,
+                        231.03588, 238.02891, 237.0, 244.0, 243.0, 247.0, 247.0, 251.0, 252.0, 257.0,
+                        258.0, 259.0, 266.0, 267.0, 268.0, 269.0, 270.0, 269.0, 278.0, 281.0,
+                        282.0, 285.0, 286.0, 289.0, 290.0, 293.0, 294.0, 294.0])
+
+# Pauling electronegativities. NaN for elements without data.
+# Example: electronegativity[9] => 3.98
+electronegativity = np.array([nan, 2.20, nan,  0.98, 1.57, 2.04, 2.55, 3.04, 3.44, 3.98, nan,
+                                 0.93, 1.31, 1.61, 1.90, 2.19, 2.58, 3.16, nan,  0.82, 1.00,
+                                 1.36, 1.54, 1.63, 1.66, 1.55, 1.83, 1.88, 1.91, 1.90, 1.65,
+                                 1.81, 2.01, 2.18, 2.55, 2.96, 3.00, 0.82, 0.95, 1.22, 1.33,
+                                 1.60, 2.16, 1.90, 2.20, 2.28, 2.20, 1.93, 1.69, 1.78, 1.96,
+                                 2.05, 2.10, 2.66, 2.60, 0.79, 0.89, 1.10, 1.12, 1.13, 1.14,
+                                 1.13, 1.17, 1.20, 1.20, 1.10, 1.22, 1.23, 1.24, 1.25, 1.10,
+                                 1.27, 1.30, 1.50, 2.36, 1.90, 2.20, 2.20, 2.28, 2.54, 2.00,
+                                 1.62, 2.33, 2.02, 2.00, 2.20, 2.20, 0.70, 0.90, 1.10, 1.30,
+                                 1.50, 1.38, 1.36, 1.28, 1.30, 1.30, 1.30, 1.30, 1.30, 1.30,
+                                 1.30, 1.30, 1.30, nan,  nan,  nan,  nan,  nan,  nan,  nan,
+                                 nan,  nan,  nan,  nan,  nan,  nan,  nan,  nan])
+del nan
+
+# Chemical symbols without padding, and the padded labels of element_list, as arrays
+# Example: element_symbols[[1, 6]] => array(['H', 'C'])
+element_symbols = np.array([symbol.strip() for symbol in element_list])
+element_labels = np.array(element_list, dtype=object)
+
+
+def symbol_codes():
+    '''
+        Atomic numbers indexed by the first two characters of a chemical symbol (256*code1 + code2),
+        with code2 = 0 or ' ' for one-letter symbols. Zero for unknown symbols.
+    '''
+    table = np.zeros(256 * 256, dtype=np.int64)
+    for number, symbol in enumerate(element_symbols[1:], start=1):
+        code = 256 * ord(symbol[0]) + (ord(symbol[1]) if len(symbol) > 1 else 0)
+        table[code] = number
+        if len(symbol) == 1:
+            table[code + ord(' ')] = number
+    return table
+
+
+symbol_table = symbol_codes()
+
+
+def symbols_to_numbers(symbols):
+    '''
+        Convert an array (any shape) of chemical symbols (str or bytes, e.g. ['C', 'H', 'H ']) to
+        atomic numbers in one vectorized lookup.
+        Example: symbols_to_numbers(['Nb', 'O']) => array([41, 8])
+    '''
+    symbols = np.asarray(symbols)
+    if symbols.dtype.kind not in 'SU':
+        symbols = symbols.astype(str)
+    # character codes (bytes, or UCS-4 for str) with at least three characters per symbol:
+    # the third one detects symbols longer than two characters
+    width = max(symbols.dtype.itemsize // (4 if symbols.dtype.kind == 'U' else 1), 3)
+    symbols = symbols.astype('{}{}'.format(symbols.dtype.kind, width))
+    codes = np.ascontiguousarray(symbols).view(np.uint32 if symbols.dtype.kind == 'U' else np.uint8)
+    codes = codes.reshape(-1, width)
+    numbers = symbol_table[256 * np.minimum(codes[:, 0], 255).astype(np.int64) + np.minimum(codes[:, 1], 255)]
+    numbers[(codes[:, 2] != 0) & (codes[:, 2] != ord(' '))] = 0
+    if np.any(numbers == 0):
+        raise Exception("Unknown chemical symbol {}.".format(symbols.reshape(-1)[np.argmin(numbers)]))
+    return numbers.reshape(symbols.shape)
+
+
+def numbers_to_symbols(numbers):
+    '''
+        Convert an array (any shape) of atomic numbers to chemical symbols (without padding).
+        Example: numbers_to_symbols([41, 8]) => array(['Nb', 'O'])
+    '''
+    numbers = np.asarray(numbers, dtype=np.int64)
+    if numbers.size and (numbers.min() < 0 or numbers.max() >= element_symbols.shape[0]):
+        raise Exception("Atomic numbers should be between 0 and {}.".format(element_symbols.shape[0] - 1))
+    return element_symbols[numbers]
+
+
+# Atomic units
+# Example: length_in_bohr = length_in_angstrom / bohr_radius
+bohr_radius = 0.529177210903  # Angstrom
+hartree = 27.211386245988     # eV
+coulomb_constant = 14.3996454784  # eV Angstrom / e^2
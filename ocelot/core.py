@@ -22,14 +22,46 @@ Module core
 '''
 
 from abc import ABCMeta, abstractmethod
-from collections import Counter
-from copy import deepcopy
-from pickle import dump, load
-from sys import argv
-from scipy.spatial.transform import Rotation
+from copy import copy
+from functools import wraps
+from inspect import signature
+import sys
 import numpy as np
-import pandas as pd
-from .constants import element_list, atomic_number, covalent_radius  # comment this line to test
+from .constants import element_labels
+from .archive import Archive, write_archive
+from .fileio import read_poscar, read_xyz, write_poscar, write_xyz
+from .neighbors import covalent_bonds, neighbor_list
+from .topology import Topology, bond_angles, torsion_angles
+
+
+def cached(method):
+    '''
+        Decorator to memoize a Chemical method. Results are reused until the structure
+        changes (Chemical.version). Calls with unhashable arguments are not cached.
+        Cached dataframes are returned as (deep) copies, so editing them does not change the cache.
+    '''
+    method_signature = signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        arguments = method_signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        key = (method.__name__,) + tuple(arguments.arguments.items())[1:]
+        cache = self.cache
+        try:
+            found = key in cache
+        except TypeError:
+            # unhashable arguments
+            return method(self, *args, **kwargs)
+        if not found:
+            cache[key] = method(self, *args, **kwargs)
+        value = cache[key]
+        # pandas is imported on demand: if it is not loaded, value is not a dataframe
+        pandas = sys.modules.get('pandas')
+        if pandas is not None and isinstance(value, pandas.DataFrame):
+            return value.copy()
+        return value
+    return wrapper
 
 
 class Atom(object):
@@ -46,21 +78,35 @@ class Atom(object):
     Example 2:
         To initialize a chloride anion (charge = -1.0), at coordinates = (0.0, 0.0, 3.14), use:
         chloride1 = Atom(element = 17, charge = -1.0, spin = 0.0, coordinates = [0.0, 0.0, 3.14])
+
+    An Atom object is a lightweight view into one row of an AtomArrays object. Atoms returned
+    by Molecule.atoms or Material.atoms share their data with the parent object.
     '''
+    __slots__ = ('__arrays', '__index')
+
     def __init__(self, element=0, charge=0.0, spin=0.0, coordinates=np.array([0.0, 0.0, 0.0])):
         '''
         Atom object constructor.
         '''
         if ((element < 0) or (element > 118)): 
             raise Exception("Element should be defined by atomic number between 0 and 118.")
-        self.__element = element
-        self.__charge = charge
-        self.__spin = spin
-        self.__coordinates = np.array(coordinates)
+        self.__arrays = AtomArrays(elements=[element], charges=[charge], spins=[spin],
+                                   coordinates=[coordinates])
+        self.__index = 0
+
+    @classmethod
+    def view(cls, arrays, index):
+        '''
+            Return an Atom object sharing the data of row "index" of an AtomArrays object.
+        '''
+        atom = cls.__new__(cls)
+        atom.__arrays = arrays
+        atom.__index = index
+        return atom
 
     @property
     def element(self):
-        return self.__element
+        return int(self.__arrays.elements[self.__index])
 
     @element.setter
     def element(self, value):
@@ -68,27 +114,27 @@ class Atom(object):
             raise TypeError("Atomic element should be defined by their atomic number.")
         elif ((value < 0) or (value > 118)):
             raise Exception("Atomic number must be a integer number between 0 and 118.")
-        self.__element = value
+        self.__arrays.update('elements', value, self.__index)
 
     @property
     def charge(self):
-        return self.__charge
+        return float(self.__arrays.charges[self.__index])
 
     @charge.setter
     def charge(self, value):
-        self.__charge = value
+        self.__arrays.update('charges', value, self.__index)
 
     @property
     def spin(self):
-        return self.__spin
+        return float(self.__arrays.spins[self.__index])
 
     @spin.setter
     def spin(self, value):
-        self.__spin = value
+        self.__arrays.update('spins', value, self.__index)
 
     @property
     def coordinates(self):
-        return self.__coordinates
+        return self.__arrays.coordinates[self.__index]
 
     @coordinates.setter
     def coordinates(self, values):
@@ -96,86 +142,409 @@ class Atom(object):
             raise TypeError("Coordinates should by type list or numpy array (np.ndarray).")
         elif len(values) != 3:
             raise Exception("Coordinates must be 3 values in a list or numpy array.")
-        self.__coordinates = np.array(values)
+        self.__arrays.update('coordinates', values, self.__index)
+
+
+class AtomArrays(object):
+    '''
+        Columnar storage for a set of atoms: atomic numbers (integer array), charges and spins
+        (float arrays), coordinates (N x 3 float64 array), and fragment ids (integer array)
+        identifying the molecule each atom came from.
+
+        Arrays are returned as read-only views, so every change goes through the setters, update()
+        or Atom views, which increment the version counter.
+    '''
+    def __init__(self, elements=(), charges=None, spins=None, coordinates=None, fragments=None, copy=True):
+        '''
+            AtomArrays object constructor.
+            With copy=False, numpy arrays (or memory maps) of the right type are used without copying.
+        '''
+        convert = np.array if copy else np.asarray
+        self.__elements = convert(elements, dtype=np.int64).reshape(-1)
+        if np.any(self.__elements < 0) or np.any(self.__elements > 118):
+            raise Exception("Element should be defined by atomic number between 0 and 118.")
+        number_of_atoms = self.__elements.shape[0]
+        if charges is None:
+            charges = np.zeros(number_of_atoms)
+        if spins is None:
+            spins = np.zeros(number_of_atoms)
+        if coordinates is None:
+            coordinates = np.zeros([number_of_atoms, 3])
+        if fragments is None:
+            fragments = np.zeros(number_of_atoms, dtype=np.int64)
+        self.__fragments = convert(fragments, dtype=np.int64).reshape(-1)
+        if self.__fragments.shape[0] != number_of_atoms:
+            raise Exception("Number of fragment ids does not match the number of atoms.")
+        self.__charges = self.__column(charges, (number_of_atoms,), convert)
+        self.__spins = self.__column(spins, (number_of_atoms,), convert)
+        self.__coordinates = self.__column(coordinates, (number_of_atoms, 3), convert)
+        self.__version = 0
+
+    @staticmethod
+    def __column(values, shape, convert=np.array):
+        column = convert(values, dtype=np.float64)
+        if column.shape != shape:
+            try:
+                column = column.reshape(shape)
+            except ValueError:
+                raise Exception("Array with shape {} does not match {} atoms.".format(column.shape, shape[0]))
+        return column
+
+    @classmethod
+    def from_atoms(cls, atoms):
+        '''
+            Build an AtomArrays object from a list of Atom objects.
+        '''
+        return cls(
+            elements=[atom.element for atom in atoms],
+            charges=[atom.charge for atom in atoms],
+            spins=[atom.spin for atom in atoms],
+            coordinates=np.array([atom.coordinates for atom in atoms], dtype=np.float64).reshape(-1, 3))
+
+    @classmethod
+    def concatenate(cls, arrays_list):
+        '''
+            Return a new AtomArrays object with the atoms of all objects in arrays_list.
+            Combined arrays are allocated once. Fragment ids are renumbered, so fragments
+            coming from different objects keep distinct ids.
+        '''
+        arrays_list = list(arrays_list)
+        if not arrays_list:
+            return cls()
+        fragment_counts = [int(arrays.fragments.max()) + 1 if len(arrays) else 0 for arrays in arrays_list]
+        fragment_offsets = np.cumsum([0] + fragment_counts[:-1])
+        return cls(
+            elements=np.concatenate([arrays.elements for arrays in arrays_list]),
+            charges=np.concatenate([arrays.charges for arrays in arrays_list]),
+            spins=np.concatenate([arrays.spins for arrays in arrays_list]),
+            coordinates=np.concatenate([arrays.coordinates for arrays in arrays_list]),
+            fragments=np.concatenate([arrays.fragments + offset
+                                      for arrays, offset in zip(arrays_list, fragment_offsets)]),
+            copy=False)
+
+    def take(self, indices):
+        '''
+            Return a new AtomArrays object with the atoms selected by indices (or boolean mask).
+        '''
+        return AtomArrays(self.__elements[indices], self.__charges[indices], self.__spins[indices],
+                          self.__coordinates[indices], self.__fragments[indices], copy=False)
+
+    def __len__(self):
+        return self.__elements.shape[0]
+
+    @staticmethod
+    def __readonly(array):
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def update(self, column, values, index=slice(None)):
+        '''
+            Write values into rows "index" of a column ('elements', 'charges', 'spins', 'coordinates'
+            or 'fragments') in place, and increment the version counter.
+        '''
+        arrays = {'elements': self.__elements, 'charges': self.__charges, 'spins': self.__spins,
+                  'coordinates': self.__coordinates, 'fragments': self.__fragments}
+        if column not in arrays:
+            raise Exception("Unknown atomic data column {}.".format(column))
+        if column == 'elements' and (np.any(np.asarray(values) < 0) or np.any(np.asarray(values) > 118)):
+            raise Exception("Element should be defined by atomic number between 0 and 118.")
+        arrays[column][index] = values
+        self.touch()
+
+    @property
+    def version(self):
+        return self.__version
+
+    def touch(self):
+        '''
+            Increment the version counter after an in-place modification of the arrays.
+        '''
+        self.__version += 1
+
+    @property
+    def elements(self):
+        return self.__readonly(self.__elements)
+
+    @elements.setter
+    def elements(self, values):
+        values = np.array(values, dtype=np.int64).reshape(-1)
+        if values.shape != self.__elements.shape:
+            raise Exception("Number of elements does not match the number of atoms.")
+        if np.any(values < 0) or np.any(values > 118):
+            raise Exception("Element should be defined by atomic number between 0 and 118.")
+        self.__elements = values
+        self.touch()
+
+    @property
+    def charges(self):
+        return self.__readonly(self.__charges)
+
+    @charges.setter
+    def charges(self, values):
+        self.__charges = self.__column(values, self.__charges.shape)
+        self.touch()
+
+    @property
+    def spins(self):
+        return self.__readonly(self.__spins)
+
+    @spins.setter
+    def spins(self, values):
+        self.__spins = self.__column(values, self.__spins.shape)
+        self.touch()
+
+    @property
+    def coordinates(self):
+        return self.__readonly(self.__coordinates)
+
+    @coordinates.setter
+    def coordinates(self, values):
+        self.__coordinates = self.__column(values, self.__coordinates.shape)
+        self.touch()
+
+    @property
+    def fragments(self):
+        return self.__readonly(self.__fragments)
+
+    @fragments.setter
+    def fragments(self, values):
+        values = np.array(values, dtype=np.int64).reshape(-1)
+        if values.shape != self.__fragments.shape:
+            raise Exception("Number of fragment ids does not match the number of atoms.")
+        self.__fragments = values
+        self.touch()
+
+    def copy(self):
+        '''
+            Return a deep copy of the arrays (with version counter reset).
+        '''
+        return AtomArrays(self.__elements, self.__charges, self.__spins, self.__coordinates, self.__fragments)
 
 
 class Chemical(Atom):
     '''
         Abstract class to build both Molecule and Material classes.
+        Atomic data is stored as columnar arrays (AtomArrays object).
     '''
 
     __metaclass__ = ABCMeta
 
+    def __init__(self, atoms=None):
+        '''
+            Store a list of Atom objects (or an AtomArrays object) as columnar arrays.
+        '''
+        if isinstance(atoms, AtomArrays):
+            self.__arrays = atoms
+        else:
+            self.__arrays = AtomArrays.from_atoms([] if atoms is None else atoms)
+        self.__cache = {}
+        self.__cache_version = None
+
+    @property
+    def arrays(self):
+        return self.__arrays
+
+    @arrays.setter
+    def arrays(self, value):
+        if not isinstance(value, AtomArrays):
+            raise TypeError("Atomic data should be an AtomArrays object.")
+        self.__arrays = value
+        self.__cache = {}
+
+    @property
+    def version(self):
+        return self.__arrays.version
+
+    def touch(self):
+        '''
+            Mark the object as modified, discarding cached data
+            (needed after changing arrays shared with the object, e.g. passed with copy=False).
+        '''
+        self.__arrays.touch()
+
+    @property
+    def cache(self):
+        '''
+            Dictionary with derived data (dataframe, bonds, topology) for the current version.
+        '''
+        if self.__cache_version != self.version:
+            self.__cache = {}
+            self.__cache_version = self.version
+        return self.__cache
+
+    @property
+    def atoms(self):
+        '''
+            Tuple of Atom views of the structure (read-only sequence: use join() to add atoms).
+        '''
+        return tuple(Atom.view(self.__arrays, index) for index in range(len(self.__arrays)))
+
+    @property
+    def elements(self):
+        return self.__arrays.elements
+
+    @property
+    def charges(self):
+        return self.__arrays.charges
+
+    @property
+    def spins(self):
+        return self.__arrays.spins
+
+    @property
+    def coordinates(self):
+        return self.__arrays.coordinates
+
+    @coordinates.setter
+    def coordinates(self, values):
+        self.__arrays.coordinates = values
+
+    @property
+    def fragments(self):
+        return self.__arrays.fragments
+
+    def __len__(self):
+        return len(self.__arrays)
+
+    def element_order(self):
+        '''
+            Return the permutation sorting atoms by atomic number (row order of to_dataframe()).
+        '''
+        return np.argsort(self.elements, kind='stable')
+
+    @cached
     def to_dataframe(self):
         '''
             Convert a list of atoms in a pandas dataframe.
         '''
-        elements = [int(atom.element) for atom in self.atoms]
-        coordinates = [atom.coordinates for atom in self.atoms]
-
-        coordinate_x = np.array(coordinates)[:, 0]
-        coordinate_y = np.array(coordinates)[:, 1]
-        coordinate_z = np.array(coordinates)[:, 2]
+        import pandas as pd
+        order = self.element_order()
+        elements = self.elements[order]
+        coordinates = self.coordinates[order]
 
         df = pd.DataFrame()
         df['element'] = elements
-        df['label'] = [element_list[atom] for atom in elements]
-        df['x'] = coordinate_x
-        df['y'] = coordinate_y
-        df['z'] = coordinate_z
-        df.sort_values('element', inplace=True)
-        df = df.reset_index().drop(['index'], axis=1)
+        df['label'] = element_labels[elements]
+        df['x'] = coordinates[:, 0]
+        df['y'] = coordinates[:, 1]
+        df['z'] = coordinates[:, 2]
         return df
 
     def min_coordinates(self):
-        df = self.to_dataframe()
-        return [df['x'].min(), df['y'].min(), df['z'].min()]
+        return list(self.coordinates.min(axis=0))
 
     def max_coordinates(self):
-        df = self.to_dataframe()
-        return [df['x'].max(), df['y'].max(), df['z'].max()]
+        return list(self.coordinates.max(axis=0))
 
-    def move(self, vector=np.array([0.0, 0.0, 0.0])):
+    def copy(self):
+        '''
+            Return a new object with a copy of the atomic arrays (cached data is not copied).
+        '''
+        new_obj = copy(self)
+        new_obj.arrays = self.arrays.copy()
+        return new_obj
+
+    def move(self, vector=np.array([0.0, 0.0, 0.0]), inplace=False):
         '''
             Return a new object shifted by a constant vector.
+            With inplace=True, the object itself is shifted (and returned).
         '''
-        new_obj = deepcopy(self)
-        for atom in new_obj.atoms:
-            atom.coordinates += vector
+        new_obj = self if inplace else self.copy()
+        new_obj.arrays.update('coordinates', new_obj.coordinates + np.asarray(vector, dtype=np.float64))
         return new_obj
 
-    def rotate(self, seq='z', angles=0.0, degrees=True):
+    def rotate(self, seq='z', angles=0.0, degrees=True, inplace=False):
         '''
             Return a new object rotated by Euler matrices with sequence "seq", and angles "angles".
+            With inplace=True, the object itself is rotated (and returned).
         '''
-        new_obj = deepcopy(self)
-        R = Rotation.from_euler(seq, angles, degrees)
-        for atom in new_obj.atoms:
-            atom.coordinates = R.apply(atom.coordinates)
+        from scipy.spatial.transform import Rotation
+        new_obj = self if inplace else self.copy()
+        matrix = Rotation.from_euler(seq, angles, degrees).as_matrix()
+        new_obj.arrays.update('coordinates', np.matmul(new_obj.coordinates, matrix.T))
         return new_obj
 
-    def save(self, filename):
+    def batch_transform(self, rotations=None, translations=None):
+        '''
+            Apply K rigid transformations (rotation followed by translation) to the coordinates,
+            without creating new objects. Return a (K, N, 3) array.
+            rotations: scipy Rotation object (with K rotations) or array of K 3x3 matrices.
+            translations: array of K vectors.
+            Example (coordinates of 100 random orientations):
+                coordinates = molecule.batch_transform(Rotation.random(100))
+        '''
+        if rotations is None and translations is None:
+            raise Exception("Define rotations and/or translations.")
+        if hasattr(rotations, 'as_matrix'):
+            # scipy Rotation object
+            rotations = rotations.as_matrix()
+        coordinates = self.coordinates
+        if rotations is not None:
+            rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3, 3)
+            coordinates = np.matmul(coordinates[np.newaxis, :, :], np.transpose(rotations, (0, 2, 1)))
+        else:
+            coordinates = coordinates[np.newaxis, :, :]
+        if translations is not None:
+            translations = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+            coordinates = coordinates + translations[:, np.newaxis, :]
+        return coordinates
+
+    @abstractmethod
+    def parameters(self):
+        pass
+
+    def record(self):
         '''
-            Save object with pickle.
+            Return the object as a tuple (class name, constructor parameters, arrays),
+            the layout stored in ocelot archives.
         '''
-        with open(filename, "wb") as handle:
-            dump(self, handle)
+        arrays = {
+            'elements': self.elements,
+            'charges': self.charges,
+            'spins': self.spins,
+            'coordinates': self.coordinates,
+            'fragments': self.fragments}
+        return type(self).__name__, self.parameters(), arrays
 
-    def load(self, filename):
+    @staticmethod
+    def from_record(kind, parameters, arrays):
         '''
-            Load object with pickle.
+            Build a Molecule or Material object from a record (see record()).
+            Arrays are used without copying (e.g. memory maps).
         '''
-        with open(filename, "rb") as handle:
-            obj = load(handle)
+        classes = {'Molecule': Molecule, 'Material': Material}
+        if kind not in classes:
+            raise Exception("Unknown structure type {} in archive.".format(kind))
+        atom_arrays = AtomArrays(arrays['elements'], arrays['charges'], arrays['spins'],
+                                 arrays['coordinates'], arrays.get('fragments'), copy=False)
+        chemical = classes[kind](atom_arrays, **parameters)
+        if 'selective_dynamics' in arrays:
+            chemical.selective_dynamics = arrays['selective_dynamics']
+        return chemical
 
-        return obj
+    def save(self, filename):
+        '''
+            Save object in ocelot binary format (header + raw arrays).
+        '''
+        write_archive(filename, [self.record()])
+
+    @classmethod
+    def load(cls, filename, index=0, mmap=True):
+        '''
+            Load object saved with save() (or structure "index" of an archive).
+            With mmap=True arrays are memory mapped (copy-on-write), so opening is near-instant.
+            Usage:
+                molecule = Molecule.load('./molecule.ocelot')
+        '''
+        return Chemical.from_record(*Archive(filename).record(index, mmap=mmap))
 
     @abstractmethod
     def from_xyz(self, filename):
         pass
 
     @abstractmethod
-    def write_xyz(self):
+    def write_xyz(self, filename=None, comment='', mode='w'):
         pass
 
 
@@ -183,26 +552,22 @@ class Molecule(Chemical):
     '''
         Molecule is defined by a list of atoms, charge and spin. 
     '''
-    def __init__(self, atoms=[Atom()], charge=None, spin=None, vacuum=15.0, fixed=False):
+    def __init__(self, atoms=None, charge=None, spin=None, vacuum=15.0, fixed=False):
         '''
             Molecule object constructor.
         '''
-        self.__atoms = atoms
+        Chemical.__init__(self, atoms)
         self.__vacuum = vacuum
         self.__fixed = fixed
         if charge is None:
-            self.__charge = sum([atom.charge for atom in self.__atoms])
+            self.__charge = float(np.sum(self.charges))
         else:
             self.__charge = charge
         if spin is None:
-            self.__spin = sum([atom.spin for atom in self.__atoms])
+            self.__spin = float(np.sum(self.spins))
         else:
             self.__spin = spin
 
-    @property
-    def atoms(self):
-        return self.__atoms
-
     @property
     def charge(self):
         return self.__charge
@@ -235,164 +600,141 @@ class Molecule(Chemical):
     def fixed(self, value):
         self.__fixed = value
 
+    @cached
     def bonds(self, tolerance=0.2):
         '''
             Return a dataframe with bonds among atoms of a molecule object.
             Use distances up to (1+tolerance)*(R_i + R_j), with R_i the covalent radius of atom i.
         '''
-        bonds_topology = []
-        directions = []
-        df = self.to_dataframe()
-
-        for index1, atom1 in df.iterrows():
-            for index2, atom2 in df.iterrows():
-                d = np.linalg.norm(atom1[['x', 'y', 'z']] - atom2[['x', 'y', 'z']])
-                covalent_sum = covalent_radius[int(atom1['element'])] + covalent_radius[int(atom2['element'])]
-                if (d < covalent_sum*(1+tolerance)) and (d > 0.0) and (index2 > index1):
-                    bonds_topology.append([
-                        index1,
-                        index2,
-                        df['label'].iloc[index1],
-                        df['label'].iloc[index2],
-                        d])
-                    directions.append(
-                        (np.array(atom1[['x', 'y', 'z']], dtype=np.float32)
-                        - np.array(atom2[['x', 'y', 'z']], dtype=np.float32))/d)
-
-        bonds_df = pd.DataFrame(bonds_topology, columns=[
-            'index 1',
-            'index 2',
-            'label 1',
-            'label 2',
-            'distance'])
-        bonds_df['direction'] = directions
-        bonds_df.sort_values('distance', inplace=True)
-        bonds_df = bonds_df.reset_index().drop(['index'], axis=1)
+        import pandas as pd
+        order = self.element_order()
+        coordinates = self.coordinates[order]
+        labels = element_labels[self.elements[order]]
+        index1, index2, distances = covalent_bonds(self.elements[order], coordinates, tolerance)
+        directions = (coordinates[index1] - coordinates[index2]) / distances[:, np.newaxis]
+
+        sorting = np.lexsort((index2, index1, distances))
+        index1, index2 = index1[sorting], index2[sorting]
+        bonds_df = pd.DataFrame({
+            'index 1': index1,
+            'index 2': index2,
+            'label 1': labels[index1],
+            'label 2': labels[index2],
+            'distance': distances[sorting]})
+        bonds_df['direction'] = list(directions[sorting])
         return bonds_df
         # end of bonds() method
 
-    def nearest_neighbors_list(self, bonds=None):
+    def nearest_neighbors_list(self, bonds=None, tolerance=0.2):
         '''
             From each atom in the molecule object, return a list with nearest neighbors (atom) indeces.
         '''
-        if bonds:
-            bonds_df = bonds
-        else:
-            bonds_df = self.bonds()
-
-        number_of_atoms = self.to_dataframe().shape[0]
-        nn_list = []
-        for atom_index in range(number_of_atoms):
-            nn_atom = []
-            for index, bond in bonds_df.iterrows():
-                if atom_index == bond['index 1']:
-                    nn_atom.append(bond['index 2'])
-                elif atom_index == bond['index 2']:
-                    nn_atom.append(bond['index 1'])
-
-            nn_list.append(nn_atom)
-        return nn_list
+        if bonds is None:
+            bonds = self.bonds(tolerance=tolerance)
+        topology = Topology(len(self), bonds['index 1'].to_numpy(), bonds['index 2'].to_numpy())
+        indices, indptr = topology.indices, topology.indptr
+        return [indices[start:stop].tolist() for start, stop in zip(indptr[:-1], indptr[1:])]
         # end of nearest_neighbors_list() method
 
-    def nearest_neighbors_matrix(self, bonds=None):
+    def nearest_neighbors_matrix(self, bonds=None, tolerance=0.2, format='csr'):
         '''
-            Return a N*N matrix (dataframe) with N = number of atoms.
-            The matrix element [i][j] is the bond distance if i and j are nearest neighbors,
+            Return a N*N sparse matrix with N = number of atoms.
+            The matrix element [i][j] (i < j) is the bond distance if i and j are nearest neighbors,
             and 0 otherwise.
-        '''
-        if bonds:
-            bonds_df = bonds
-        else:
-            bonds_df = self.bonds()
-
-        number_of_atoms = self.to_dataframe().shape[0]
-        nn_matrix = np.zeros([number_of_atoms, number_of_atoms])
-        for index, bond in bonds_df.iterrows():
-            nn_matrix[bond['index 1']][bond['index 2']] = bond['distance']
-
-        return pd.DataFrame(nn_matrix)
+            Use format = 'csr' or 'coo' for scipy.sparse matrices, and format = 'dense' for a
+            dataframe (only recommended for small molecules).
+        '''
+        from scipy.sparse import coo_matrix
+        import pandas as pd
+        if bonds is None:
+            bonds = self.bonds(tolerance=tolerance)
+
+        number_of_atoms = len(self)
+        nn_matrix = coo_matrix(
+            (bonds['distance'].to_numpy(), (bonds['index 1'].to_numpy(), bonds['index 2'].to_numpy())),
+            shape=(number_of_atoms, number_of_atoms))
+        if format == 'coo':
+            return nn_matrix
+        elif format == 'csr':
+            return nn_matrix.tocsr()
+        elif format == 'dense':
+            return pd.DataFrame(nn_matrix.toarray())
+        raise Exception("Matrix format should be 'csr', 'coo' or 'dense'.")
         # end of nearest_neighbors_matrix() method
 
+    @cached
+    def topology(self, tolerance=0.2):
+        '''
+            Return the bond graph (Topology object) of a molecule object.
+            Atom indices follow the row order of to_dataframe().
+        '''
+        bonds_df = self.bonds(tolerance=tolerance)
+        return Topology(len(self), bonds_df['index 1'].to_numpy(), bonds_df['index 2'].to_numpy())
+
+    @cached
     def angles(self, tolerance=0.2):
         '''
             Return a dataframe of angles of a molecule object.
         '''
-        bonds_df = self.bonds(tolerance=tolerance)
-        df = self.to_dataframe()
-
-        number_of_atoms = df.shape[0]
-        nn_list = []
-
-        for atom_index in range(number_of_atoms):
-            nn_atom = []
-            for index, bond in bonds_df.iterrows():
-                if atom_index == bond['index 1']:
-                    nn_atom.append([bond['index 2'], np.array(bond['direction'])])
-                elif atom_index == bond['index 2']:
-                    nn_atom.append([bond['index 1'], -1*np.array(bond['direction'])])
-            nn_list.append(nn_atom)
-
-        nn_df = pd.DataFrame(nn_list)
-
-        angles = []
-        for ref_atom, bonds in nn_df.iterrows():
-            new_bonds = bonds[bonds.notnull()]
-            if len(new_bonds) > 2:
-                for neighbor1 in new_bonds:
-                    for neighbor2 in new_bonds:
-                        if (neighbor1[0] > neighbor2[0]):
-                            dot = np.dot(neighbor1[1], neighbor2[1])
-                            cross = np.cross(neighbor1[1], neighbor2[1])
-                            angle = np.arccos(np.clip(-1, 1, dot))
-                            angles.append([
-                                ref_atom,
-                                neighbor1[0],
-                                neighbor2[0],
-                                df['label'].iloc[ref_atom],
-                                df['label'].iloc[neighbor1[0]],
-                                df['label'].iloc[neighbor2[0]],
-                                angle*180/np.pi,
-                                cross/np.linalg.norm(cross)])
-
-        angles_df = pd.DataFrame(angles, columns=[
-            'index 1',
-            'index 2',
-            'index 3',
-            'label 1',
-            'label 2',
-            'label 3',
-            'angle',
-            'normal'])
+        import pandas as pd
+        order = self.element_order()
+        coordinates = self.coordinates[order]
+        labels = element_labels[self.elements[order]]
+        center, neighbor1, neighbor2 = self.topology(tolerance).angles()
+        angles, normals = bond_angles(coordinates, center, neighbor1, neighbor2)
+
+        angles_df = pd.DataFrame({
+            'index 1': center,
+            'index 2': neighbor1,
+            'index 3': neighbor2,
+            'label 1': labels[center],
+            'label 2': labels[neighbor1],
+            'label 3': labels[neighbor2],
+            'angle': angles})
+        angles_df['normal'] = list(normals)
         return angles_df
         # end of angles() method
 
+    @cached
     def dihedral_angles(self, tolerance=0.2):
         '''
             Return a dataframe of dihedral (proper) angles of a molecule object.
         '''
-        angles_df = self.angles(tolerance)
-        df = self.to_dataframe()
-        # for index1, angle1 in angles_df.iterrows():
-        #     for index2, angle2 in angles_df.iterrows():
-        # angle1['normal'] * angle2['normal']
-
-        # TODO
+        return self.__torsions_dataframe(self.topology(tolerance).dihedrals())
 
+    @cached
     def improper_angles(self, tolerance=0.2):
         '''
             Return a data frame of improper torsion angles for a molecule object.
+            Index 1 is the central atom, bonded to atoms with indices 2, 3 and 4.
         '''
-        pass  # TODO
+        return self.__torsions_dataframe(self.topology(tolerance).impropers())
+
+    def __torsions_dataframe(self, quadruplets):
+        import pandas as pd
+        order = self.element_order()
+        labels = element_labels[self.elements[order]]
+        angles = torsion_angles(self.coordinates[order], *quadruplets)
+
+        torsions_df = pd.DataFrame()
+        for position, indices in enumerate(quadruplets):
+            torsions_df['index {}'.format(position + 1)] = indices
+        for position, indices in enumerate(quadruplets):
+            torsions_df['label {}'.format(position + 1)] = labels[indices]
+        torsions_df['angle'] = angles
+        return torsions_df
+
+    def parameters(self):
+        '''
+            Return the constructor parameters of a Molecule object (besides atoms).
+        '''
+        return {'charge': self.charge, 'spin': self.spin, 'vacuum': self.vacuum, 'fixed': self.fixed}
 
     def sizes(self):
         '''
             Return a array with molecule dimensions.
         '''
-        df = self.to_dataframe()
-        delta_x = df['x'].max() - df['x'].min()
-        delta_y = df['y'].max() - df['y'].min()
-        delta_z = df['z'].max() - df['z'].min()
-        return [delta_x, delta_y, delta_z]
+        return list(np.ptp(self.coordinates, axis=0))
 
     def molecule_box(self):
         '''
@@ -404,13 +746,40 @@ class Molecule(Chemical):
         '''
             Return a vector with the center of the molecule coordinates.
         '''
-        signs = self.min_coordinates()/(np.abs(self.min_coordinates()))
-        half_size = np.array(self.sizes())/2
-        return [half_size[x] - signs[x]*self.min_coordinates()[x] for x in range(3)]
+        return list((self.coordinates.min(axis=0) + self.coordinates.max(axis=0))/2)
 
     def join(self, molecule):
-        for atom in molecule.atoms:
-            self.atoms.append(atom)
+        '''
+            Add the atoms of another molecule (as new fragments) to this molecule object.
+            To combine many molecules, use Molecule.concatenate().
+        '''
+        self.arrays = AtomArrays.concatenate([self.arrays, molecule.arrays])
+
+    @classmethod
+    def concatenate(cls, molecules, translations=None, vacuum=15.0, fixed=False):
+        '''
+            Return a new molecule object with the atoms of all molecules, allocating the combined
+            arrays once. Each molecule becomes a fragment (see fragments and fragment()).
+            translations (optional): one vector per molecule, added to its coordinates, e.g. to
+            fill a box with copies of a solvent molecule:
+                box = Molecule.concatenate([water]*1000, translations=grid_points)
+        '''
+        molecules = list(molecules)
+        arrays = AtomArrays.concatenate([molecule.arrays for molecule in molecules])
+        if translations is not None:
+            counts = [len(molecule) for molecule in molecules]
+            translations = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+            arrays.update('coordinates', arrays.coordinates + np.repeat(translations, counts, axis=0))
+        return cls(arrays,
+                   charge=sum(molecule.charge for molecule in molecules),
+                   spin=sum(molecule.spin for molecule in molecules),
+                   vacuum=vacuum, fixed=fixed)
+
+    def fragment(self, index):
+        '''
+            Return a new molecule object with the atoms of fragment "index".
+        '''
+        return Molecule(self.arrays.take(self.fragments == index).copy(), vacuum=self.vacuum)
 
     def from_xyz(self, filename):
         '''
@@ -419,50 +788,18 @@ class Molecule(Chemical):
                 molecule = Molecule()
                 molecule.from_xyz('./molecule.xyz')
         '''
-        element = []
-        coordinate_x = []
-        coordinate_y = []
-        coordinate_z = []
-        with open(filename, 'r', encoding="utf-8") as stream:
-            number_of_atoms = int(stream.readline())
-            comment = stream.readline()
-            for index in range(number_of_atoms):
-                str_atom = stream.readline()
-                str_element, str_x, str_y, str_z = str_atom.split()
-                element.append(atomic_number[str_element.strip()])
-                coordinate_x.append(float(str_x))
-                coordinate_y.append(float(str_y))
-                coordinate_z.append(float(str_z))
-
-        df = pd.DataFrame()
-        df['element'] = element
-        df['x'] = coordinate_x
-        df['y'] = coordinate_y
-        df['z'] = coordinate_z
-
-        atoms_list = []
-        for index, row in df.iterrows():
-            atom = Atom(
-                element=row['element'],
-                coordinates=np.array(row[['x', 'y', 'z']]))
-            atoms_list.append(atom)
-
-        self.__atoms = atoms_list
+        elements, coordinates, comment = read_xyz(filename)
+        self.arrays = AtomArrays(elements=elements, coordinates=coordinates)
         # end of from_xyz() method
 
-    def write_xyz(self):
+    def write_xyz(self, filename=None, comment='', mode='w'):
         '''
             Write xyz file of a Molecule object.
+            filename can be a path, a file-like object, or None (standard output).
+            Use mode='a' to append the molecule as a new frame of a trajectory file.
         '''
-        df = self.to_dataframe()
-        print(df.shape[0])
-        print("  ")
-        label = [element_list[int(atom)] for atom in list(df['element'])]
-
-        df['label'] = label
-        df = df[['label', 'x', 'y', 'z']]
-        for index, row in df.iterrows():
-            print("{}  {:.8f}  {:.8f}  {:.8f}".format(row[0], row[1], row[2], row[3]))     
+        order = self.element_order()
+        write_xyz(filename, self.elements[order], self.coordinates[order], comment=comment, mode=mode)
         # end of write_xyz() method
 
 
@@ -470,18 +807,15 @@ class Material(Chemical):
     '''
         Materials are defined by a list of atoms (object) and Bravais lattice vectors. 
     '''
-    def __init__(self, atoms, lattice_constant=1.0, bravais_vector=np.eye(3), crystallographic=True):
+    def __init__(self, atoms=None, lattice_constant=1.0, bravais_vector=np.eye(3), crystallographic=True):
         '''
             Material object constructor.
         '''
-        self.__atoms = atoms
+        Chemical.__init__(self, atoms)
         self.__lattice_constant = lattice_constant
         self.__bravais_vector = bravais_vector
         self.__crystallographic = crystallographic
-
-    @property
-    def atoms(self):
-        return self.__atoms
+        self.__selective_dynamics = None
 
     @property
     def lattice_constant(self):
@@ -492,6 +826,7 @@ class Material(Chemical):
         if not isinstance(self.__lattice_constant, float):
             raise TypeError("Lattice constant should be a float number.")
         self.__lattice_constant = value
+        self.touch()
 
     @property
     def bravais_vector(self):
@@ -500,6 +835,7 @@ class Material(Chemical):
     @bravais_vector.setter
     def bravais_vector(self, value):
         self.__bravais_vector = value
+        self.touch()
 
     @property
     def crystallographic(self):
@@ -509,6 +845,35 @@ class Material(Chemical):
     def bravais_lattice(self):
         return np.array(self.__bravais_vector) * self.__lattice_constant
 
+    @property
+    def selective_dynamics(self):
+        return self.__selective_dynamics
+
+    @selective_dynamics.setter
+    def selective_dynamics(self, value):
+        if value is not None:
+            value = np.array(value, dtype=bool).reshape(-1, 3)
+            if value.shape[0] != len(self):
+                raise Exception("Selective dynamics flags must be defined for all atoms.")
+        self.__selective_dynamics = value
+
+    def parameters(self):
+        '''
+            Return the constructor parameters of a Material object (besides atoms).
+        '''
+        return {'lattice_constant': self.lattice_constant,
+                'bravais_vector': np.asarray(self.bravais_vector, dtype=np.float64).tolist(),
+                'crystallographic': self.crystallographic}
+
+    def record(self):
+        '''
+            Archive record (see Chemical.record()), with the selective dynamics flags if defined.
+        '''
+        kind, parameters, arrays = Chemical.record(self)
+        if self.selective_dynamics is not None:
+            arrays['selective_dynamics'] = self.selective_dynamics
+        return kind, parameters, arrays
+
     def from_molecule(self, molecule):
         pass  # TODO
 
@@ -516,139 +881,140 @@ class Material(Chemical):
         pass  # TODO
 
     def from_poscar(self, filename):
-        pass  # TODO
+        '''
+            Set material object with data from a POSCAR (or CONTCAR) file.
+            Usage:
+                material = Material()
+                material.from_poscar('./POSCAR')
+        '''
+        lattice_constant, bravais_vector, elements, coordinates, crystallographic, flags = read_poscar(filename)
+        self.arrays = AtomArrays(elements=elements, coordinates=coordinates)
+        self.__lattice_constant = lattice_constant
+        self.__bravais_vector = bravais_vector
+        self.__crystallographic = crystallographic
+        self.__selective_dynamics = flags
+        # end of from_poscar() method
+
+    def write_xyz(self, filename=None, comment='', mode='w'):
+        '''
+            Write xyz file of a Material object (cartesian coordinates).
+            filename can be a path, a file-like object, or None (standard output).
+            Use mode='a' to append the material as a new frame of a trajectory file.
+        '''
+        order = self.element_order()
+        write_xyz(filename, self.elements[order], self.cartesian_coordinates()[order], comment=comment, mode=mode)
 
-    def write_xyz(self):
+    def cartesian_coordinates(self):
         '''
-            Write xyz file of a Material object.
+            Return atomic coordinates in cartesian units (converted if crystallographic).
         '''
-        df = self.to_dataframe()
-        print(df.shape[0])
-        print("  ")   
-        label = [element_list[atom] for atom in list(df['element'])]
+        if self.crystallographic:
+            return np.matmul(self.coordinates, self.bravais_lattice)
+        return self.coordinates
 
-        df['label'] = label
+    def crystallographic_coordinates(self):
+        '''
+            Return atomic coordinates in units of the Bravais vectors (converted if cartesian).
+        '''
         if self.crystallographic:
-            atoms_xyz = np.matmul(np.array(df[['x', 'y', 'z']]), self.bravais_lattice.transpose())
-            df['x_cart'] = atoms_xyz[:, 0]
-            df['y_cart'] = atoms_xyz[:, 1]
-            df['z_cart'] = atoms_xyz[:, 2]
-            df = df[['label', 'x_cart', 'y_cart', 'z_cart']]
-            for index, row in df.iterrows():
-                print("{}  {:.8f}  {:.8f}  {:.8f}".format(row[0], row[1], row[2], row[3]))
-        else:
-            df = df[['label', 'x', 'y', 'z']]
-            for index, row in df.iterrows():
-                print("{}  {:.8f}  {:.8f}  {:.8f}".format(row[0], row[1], row[2], row[3]))
+            return self.coordinates
+        return np.matmul(self.coordinates, np.linalg.inv(self.bravais_lattice))
 
-    def write_poscar(self):
+    def write_poscar(self, filename=None, mode='w'):
         '''
             Write an ocelot Material object as a POSCAR file.
+            filename can be a path, a file-like object, or None (standard output).
         '''
-        bravais = self.bravais_vector
-        print("POSCAR file generated by ocelot")
-        print("  {:.8f}".format(self.lattice_constant))
-        print("    {:.8f}  {:.8f}  {:.8f}".format(bravais[0][0], bravais[0][1], bravais[0][2]))
-        print("    {:.8f}  {:.8f}  {:.8f}".format(bravais[1][0], bravais[1][1], bravais[1][2]))
-        print("    {:.8f}  {:.8f}  {:.8f}".format(bravais[2][0], bravais[2][1], bravais[2][2]))
-
-        element = self.to_dataframe()['element']
-        unique_atoms = Counter(element)
-        print("   ", end=" ")
-        for unique_atom in unique_atoms:
-            print(element_list[unique_atom], end=" ")
+        order = self.element_order()
+        flags = None if self.selective_dynamics is None else self.selective_dynamics[order]
+        write_poscar(filename, self.elements[order], self.crystallographic_coordinates()[order],
+                     self.lattice_constant, self.bravais_vector, selective_dynamics=flags, mode=mode)
 
-        print("\n   ", end=" ")
-        for unique_atom in unique_atoms:
-            print(unique_atoms[unique_atom], end="  ")
-
-        print("\nDirect")
-        if self.crystallographic:
-            coordinates_block = self.to_dataframe()[['x', 'y', 'z']]
-            print(coordinates_block.to_string(index=False, header=False))
-        else:
-            coordinates_xyz = np.array(self.to_dataframe()[['x', 'y', 'z']])
-            # REFACTORING
-            coordinates_crystal = np.matmul(coordinates_xyz, np.linalg.inv(self.bravais_lattice))
-            coordinates_df = pd.DataFrame(coordinates_crystal)
-            print(coordinates_df.to_string(index=False, header=False))
+    def neighbor_list(self, cutoff):
+        '''
+            Return a NeighborList (CSR layout) with all pairs of atoms closer than cutoff,
+            including periodic images, with image offsets and distance vectors.
+            Atom indices follow the order of the atoms in the Material object.
+        '''
+        return neighbor_list(self.cartesian_coordinates(), cutoff, lattice=self.bravais_lattice)
 
     def reciprocal_lattice(self):
         return 2 * np.pi * np.linalg.inv(self.bravais_lattice).transpose()
 
     def supercell_lattice(self, matrix=np.eye(3)):
+        '''
+            Return the Bravais lattice of the supercell defined by matrix (rows of the new
+            lattice in terms of the original Bravais vectors).
+        '''
         self.__matrix = np.array(matrix)
-        return self.bravais_lattice * self.__matrix
-
-
-# testing module core
-if __name__ == '__main__':
-    from constants import element_list, atomic_number, covalent_radius
-    # atom1 = Atom(element = 6, charge =  1.00, coordinates = [0.86380, 1.07246, 1.16831])
-    # atom2 = Atom(element = 1, charge = -0.25, coordinates = [0.76957, 0.07016, 1.64057])
-    # atom3 = Atom(element = 1, charge = -0.25, coordinates = [1.93983, 1.32622, 1.04881])
-    # atom4 = Atom(element = 1, charge = -0.25, coordinates = [0.37285, 1.83372, 1.81325])
-    # atom5 = Atom(element = 1, charge = -0.25, coordinates = [0.37294, 1.05973, 0.17061])
-    # methane = Molecule(atoms = [atom1, atom2, atom3, atom4, atom5])
-    # print(methane.charge)
-    # methane.write_xyz()
-
-    # carbon1 = Atom(element = 6, charge = 0, spin = 0, coordinates = [0.0, 0.00000, 10.0])
-    # carbon2 = Atom(element = 6, charge = 0, spin = 0, coordinates = [1.42028, 0.0000, 10.0])
-    # graphene = Material(atoms = [carbon1, carbon2],
-    #                     lattice_constant = 2.46,
-    #                     bravais_vector = [[np.sqrt(3)/2, -1/2, 0.0],
-    #                                       [np.sqrt(3)/2,  1/2, 0.0],
-    #                                       [0.0, 0.0, 20.0/2.46]],
-    #                     crystallographic = False)
-    # graphene.write_poscar()
-    # print(graphene.to_dataframe())
-
-    filename = argv[1]
-    molecule = Molecule()
-    molecule.from_xyz(filename)
-    # print(molecule.min_coordinates())
-    # molecule2= molecule.move([6.19524, -0.5353, 1.68151])
-    # molecule2.write_xyz()
-    # print("Molecule center:")
-    # print(molecule.get_center())
-    print("Molecule dataframe:")
-    print(molecule.to_dataframe())
-    # molecule.write_xyz()
-
-    # print("Molecule bonds:")
-    # print(molecule.bonds())
-
-    # print("Molecule angles:")
-    # print(molecule.angles())
-
-    # mol2 = molecule.rotate('z', angles = 90).move([0.0, 0.0, 5.0])
-    # mol2.write_xyz()
-    # molecule.join(mol2)
-
-    # molecule.write_xyz()
-
-    # print('\nBonds dataframe:')
-    # print(molecule.bonds(tolerance = 0.1))
-
-    # print("\nNearest neighbors list:")
-    # print(molecule.nearest_neighbors_list())
-
-    # print('\nAngles dataframe:')
-    # print(methane.angles(tolerance = 0.1))
-
-    # methane.angles().to_csv('angles.csv', encoding='utf-8', index=False)
-    # print('\nMolecule box:')
-    # print(methane.molecule_box())
-
-    # molecule = Molecule()
-    # molecule.from_xyz("./C150H30.xyz")
-    # print("Molecule dataframe")
-    # molecule = molecule.load("test.obj")
-    # print(molecule.to_dataframe())
-
-    # print('\nBonds dataframe:')
-    # print(molecule.bonds(tolerance = 0.1))
-
-    # print('\nAngles dataframe:')
-    # print(molecule.angles(tolerance = 0.1))
+        return np.matmul(self.__matrix, self.bravais_lattice)
+
+    def make_supercell(self, matrix=np.eye(3)):
+        '''
+            Return a new Material object for the supercell defined by an integer matrix M,
+            with Bravais vectors A' = M A. Non-diagonal matrices are supported.
+            Atoms are replicated |det M| times and wrapped into the new cell.
+            Example (a 2x2x1 supercell):
+                supercell = material.make_supercell([[2, 0, 0], [0, 2, 0], [0, 0, 1]])
+        '''
+        matrix = np.array(matrix)
+        if not np.allclose(matrix, np.round(matrix)):
+            raise Exception("Supercell matrix must have integer elements.")
+        matrix = np.round(matrix).astype(np.int64)
+        number_of_cells = int(round(abs(np.linalg.det(matrix))))
+        if number_of_cells == 0:
+            raise Exception("Supercell matrix must be non-singular.")
+        inverse = np.linalg.inv(matrix)
+
+        # lattice points (in original fractional units) inside the supercell
+        corners = np.matmul(np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)]), matrix)
+        axes = [np.arange(low, high + 1) for low, high in zip(corners.min(axis=0), corners.max(axis=0))]
+        points = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+        points_fractional = np.matmul(points, inverse)
+        tolerance = 1e-8
+        inside = np.all((points_fractional > -tolerance) & (points_fractional < 1.0 - tolerance), axis=1)
+        translations = points_fractional[inside]
+        if translations.shape[0] != number_of_cells:
+            raise Exception("Found {} lattice points in supercell, expected {}.".format(
+                translations.shape[0], number_of_cells))
+
+        fractional = np.matmul(self.crystallographic_coordinates(), inverse)
+        fractional = (translations[:, np.newaxis, :] + fractional[np.newaxis, :, :]).reshape(-1, 3)
+        fractional -= np.floor(fractional)
+        fractional[fractional > 1.0 - tolerance] = 0.0
+
+        bravais_vector = np.matmul(matrix, np.asarray(self.bravais_vector, dtype=np.float64))
+        if self.crystallographic:
+            coordinates = fractional
+        else:
+            coordinates = np.matmul(fractional, bravais_vector * self.lattice_constant)
+        arrays = AtomArrays(
+            elements=np.tile(self.elements, number_of_cells),
+            charges=np.tile(self.charges, number_of_cells),
+            spins=np.tile(self.spins, number_of_cells),
+            coordinates=coordinates,
+            fragments=np.tile(self.fragments, number_of_cells),
+            copy=False)
+        supercell = Material(arrays, lattice_constant=self.lattice_constant, bravais_vector=bravais_vector,
+                             crystallographic=self.crystallographic)
+        if self.selective_dynamics is not None:
+            supercell.selective_dynamics = np.tile(self.selective_dynamics, (number_of_cells, 1))
+        return supercell
+
+
+def save_structures(filename, chemicals, names=None):
+    '''
+        Save many Molecule/Material objects in a single archive file with an index.
+    '''
+    write_archive(filename, [chemical.record() for chemical in chemicals], names=names)
+
+
+def load_structures(filename, indices=None, mmap=True):
+    '''
+        Load structures from an archive file (all of them, or only those in indices).
+    '''
+    archive = Archive(filename)
+    if indices is None:
+        indices = range(len(archive))
+    return [Chemical.from_record(*archive.record(index, mmap=mmap)) for index in indices]
+
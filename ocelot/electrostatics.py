@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+# file: electrostatics.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module electrostatics
+'''
+
+import numpy as np
+from scipy import fft
+from scipy.special import erfc
+from .constants import coulomb_constant
+from .neighbors import periodic_pairs
+from .fourier import fft_size
+
+
+def bspline(w, order):
+    '''
+        Cardinal B-spline M_n(w + j) of order n and its derivative, for j = 0, ..., n - 1 and
+        fractional parts 0 <= w < 1. Returns two arrays of shape w.shape + (order,).
+    '''
+    w = np.asarray(w, dtype=np.float64)[..., np.newaxis]
+    j = np.arange(order)
+    # M_1(w + j) is 1 for j = 0 and zero otherwise
+    values = np.where(j == 0, 1.0, 0.0) * np.ones_like(w)
+    derivatives = np.zeros_like(values)
+    for n in range(2, order + 1):
+        # M_n(x) = x/(n-1) M_{n-1}(x) + (n-x)/(n-1) M_{n-1}(x-1)
+        shifted = np.zeros_like(values)
+        shifted[..., 1:] = values[..., :-1]
+        if n == order:
+            # M_n'(x) = M_{n-1}(x) - M_{n-1}(x-1)
+            derivatives = values - shifted
+        values = ((w + j) * values + (n - w - j) * shifted) / (n - 1)
+    return values, derivatives
+
+
+class Ewald(object):
+    '''
+        Ewald summation of the electrostatic energy and forces of the point charges of a Material
+        (charges in e, lengths in Angstrom, energies in eV, forces in eV/Angstrom).
+
+        The real-space part is summed on a neighbor list (periodic images included). The reciprocal
+        part is either summed directly over the reciprocal lattice vectors (method='ewald') or
+        interpolated on a mesh with smooth particle-mesh Ewald [J. Chem. Phys. 103, 8577 (1995)]
+        (method='pme'), which costs O(N log N). Charged cells are neutralized by a uniform background.
+
+        The splitting parameter alpha, the real-space cutoff and the reciprocal cutoff (or mesh) are
+        chosen from the target accuracy unless given explicitly.
+
+        Example:
+            ewald = Ewald(material, accuracy=1e-6, method='pme')
+            energy, forces = ewald.compute()
+    '''
+    def __init__(self, material, accuracy=1e-5, method='ewald', alpha=None, cutoff=None, mesh=None, order=6,
+                 workers=-1):
+        '''
+            Ewald object constructor.
+            For method='pme', the default real-space cutoff is 8 Angstrom; the spline order must be even.
+        '''
+        if method not in ('ewald', 'pme'):
+            raise Exception("Unknown method {}. Use 'ewald' or 'pme'.".format(method))
+        if method == 'pme' and order % 2:
+            raise Exception("PME spline order must be even.")
+        self.__material = material
+        self.__accuracy = accuracy
+        self.__method = method
+        self.__order = order
+        self.__workers = workers
+        self.__lattice = material.bravais_lattice
+        self.__volume = abs(np.linalg.det(self.__lattice))
+        self.__charges = np.array(material.charges, dtype=np.float64)
+        self.__coordinates = material.cartesian_coordinates()
+
+        # erfc(alpha r_c) ~ exp(-(alpha r_c)^2) = accuracy
+        s = np.sqrt(-np.log(accuracy))
+        if alpha is None:
+            if method == 'pme' or cutoff is not None:
+                alpha = s / (8.0 if cutoff is None else cutoff)
+            else:
+                # balance real and reciprocal space work [Mol. Simul. 13, 1 (1994)]
+                alpha = np.sqrt(np.pi) * (max(len(self.__charges), 1) / self.__volume**2)**(1.0 / 6.0)
+        self.__alpha = alpha
+        self.__cutoff = s / alpha if cutoff is None else cutoff
+        self.__kcutoff = 2 * alpha * s
+        if mesh is None:
+            # highest reciprocal index along each axis, oversampled so that the B-spline interpolation
+            # error (~ (extent/mesh)^order) matches the accuracy
+            extent = self.__kcutoff * np.linalg.norm(self.__lattice, axis=1) / (2 * np.pi)
+            oversampling = max(1.5, 2.0 * (1e-6 / accuracy)**(1.0 / order))
+            mesh = [fft_size(int(np.ceil(2 * n * oversampling))) for n in extent]
+        self.__mesh = np.array(mesh, dtype=np.int64)
+
+    @property
+    def material(self):
+        return self.__material
+
+    @property
+    def accuracy(self):
+        return self.__accuracy
+
+    @property
+    def method(self):
+        return self.__method
+
+    @property
+    def alpha(self):
+        return self.__alpha
+
+    @property
+    def cutoff(self):
+        return self.__cutoff
+
+    @property
+    def kcutoff(self):
+        return self.__kcutoff
+
+    @property
+    def mesh(self):
+        return self.__mesh
+
+    def compute(self):
+        '''
+            Return the electrostatic energy and the forces on every atom, shape (N, 3).
+        '''
+        energy, forces = self.real_space()
+        if self.__method == 'pme':
+            reciprocal_energy, reciprocal_forces = self.particle_mesh()
+        else:
+            reciprocal_energy, reciprocal_forces = self.reciprocal_space()
+        return energy + reciprocal_energy + self.self_energy(), forces + reciprocal_forces
+
+    def energy(self):
+        return self.compute()[0]
+
+    def forces(self):
+        return self.compute()[1]
+
+    def self_energy(self):
+        '''
+            Self-interaction of the Gaussian charges and energy of the neutralizing background.
+        '''
+        q = self.__charges
+        alpha = self.__alpha
+        energy = -alpha / np.sqrt(np.pi) * np.sum(q**2) - np.pi * np.sum(q)**2 / (2 * self.__volume * alpha**2)
+        return coulomb_constant * energy
+
+    def real_space(self):
+        '''
+            Real-space energy and forces, erfc(alpha r)/r summed over the pairs within the cutoff.
+        '''
+        q = self.__charges
+        i, j, images, vectors = periodic_pairs(self.__coordinates, self.__cutoff, self.__lattice)
+        distances = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+        alpha = self.__alpha
+        qq = coulomb_constant * q[i] * q[j]
+        screened = erfc(alpha * distances) / distances
+        # each pair is listed once (an atom and its own image n stands for -n too)
+        energy = np.sum(qq * screened)
+        magnitude = qq * (screened + 2 * alpha / np.sqrt(np.pi) * np.exp(-(alpha * distances)**2)) / distances**2
+        forces = np.stack([np.bincount(j, magnitude * vectors[:, axis], minlength=len(q))
+                           - np.bincount(i, magnitude * vectors[:, axis], minlength=len(q))
+                           for axis in range(3)], axis=1)
+        return energy, forces
+
+    def reciprocal_vectors(self):
+        '''
+            Reciprocal lattice vectors (cartesian, 2 pi included) with 0 < |k| < kcutoff.
+        '''
+        reciprocal = 2 * np.pi * np.linalg.inv(self.__lattice).T
+        bounds = np.floor(self.__kcutoff * np.linalg.norm(self.__lattice, axis=1) / (2 * np.pi)).astype(np.int64)
+        miller = np.stack(np.meshgrid(*[np.arange(-n, n + 1) for n in bounds], indexing='ij'), axis=-1).reshape(-1, 3)
+        k = np.matmul(miller, reciprocal)
+        k_squared = np.sum(k**2, axis=1)
+        return k[(k_squared > 0) & (k_squared < self.__kcutoff**2)]
+
+    def reciprocal_space(self, chunk_size=2**22):
+        '''
+            Reciprocal-space energy and forces by direct summation over k vectors (in chunks of
+            about chunk_size structure factor entries).
+        '''
+        q = self.__charges
+        r = self.__coordinates
+        k = self.reciprocal_vectors()
+        k_squared = np.sum(k**2, axis=1)
+        factor = 4 * np.pi / self.__volume * np.exp(-k_squared / (4 * self.__alpha**2)) / k_squared
+
+        energy = 0.0
+        forces = np.zeros_like(r)
+        step = max(1, chunk_size // max(len(q), 1))
+        for start in range(0, k.shape[0], step):
+            block = slice(start, start + step)
+            phases = np.exp(1j * np.matmul(k[block], r.T))
+            structure = np.matmul(phases, q)
+            energy += 0.5 * np.sum(factor[block] * np.abs(structure)**2)
+            # F_i = q_i sum_k factor k Im(exp(ik.r_i) S(k)^*)
+            weights = factor[block][:, np.newaxis] * np.imag(phases * structure.conj()[:, np.newaxis])
+            forces += q[:, np.newaxis] * np.matmul(weights.T, k[block])
+        return coulomb_constant * energy, coulomb_constant * forces
+
+    def particle_mesh(self):
+        '''
+            Reciprocal-space energy and forces by smooth particle-mesh Ewald: charges are spread on
+            the mesh with B-splines, and the convolution with the Ewald kernel is done with FFTs.
+        '''
+        q = self.__charges
+        mesh = self.__mesh
+        order = self.__order
+        inverse = np.linalg.inv(self.__lattice)
+        scaled = np.matmul(self.__coordinates, inverse) * mesh
+        scaled -= mesh * np.floor(scaled / mesh)
+
+        # spline weights of the grid points floor(u) - j, j = 0, ..., order - 1
+        base = np.floor(scaled).astype(np.int64)
+        weights, derivatives = bspline(scaled - base, order)
+        points = (base[:, :, np.newaxis] - np.arange(order)) % mesh[:, np.newaxis]
+
+        flat = (points[:, 0, :, np.newaxis, np.newaxis] * mesh[1]
+                + points[:, 1, np.newaxis, :, np.newaxis]) * mesh[2] + points[:, 2, np.newaxis, np.newaxis, :]
+        w0, w1, w2 = weights[:, 0, :, None, None], weights[:, 1, None, :, None], weights[:, 2, None, None, :]
+        spread = w0 * w1 * w2
+        grid = np.bincount(flat.ravel(), (q[:, None, None, None] * spread).ravel(), minlength=int(mesh.prod()))
+
+        # kernel exp(-pi^2 m^2/alpha^2)/(pi V m^2) times the B-spline moduli
+        kernel = self.__kernel()
+        transformed = fft.fftn(grid.reshape(tuple(mesh)), workers=self.__workers)
+        energy = 0.5 * np.sum(kernel * np.abs(transformed)**2)
+        convolution = fft.ifftn(kernel * transformed, workers=self.__workers).real * mesh.prod()
+        potential = convolution.ravel()[flat]
+
+        d0, d1, d2 = derivatives[:, 0, :, None, None], derivatives[:, 1, None, :, None], derivatives[:, 2, None, None, :]
+        gradient = np.stack([np.sum(d0 * w1 * w2 * potential, axis=(1, 2, 3)),
+                             np.sum(w0 * d1 * w2 * potential, axis=(1, 2, 3)),
+                             np.sum(w0 * w1 * d2 * potential, axis=(1, 2, 3))], axis=1)
+        # du/dr = diag(mesh) inverse^T
+        forces = -q[:, np.newaxis] * np.matmul(gradient * mesh, inverse.T)
+        return coulomb_constant * energy, coulomb_constant * forces
+
+    def __kernel(self):
+        '''
+            Reciprocal-space kernel of smooth PME on the mesh, including the B-spline moduli |b(m)|^2.
+        '''
+        mesh = self.__mesh
+        order = self.__order
+        frequencies = [np.fft.fftfreq(n, 1.0 / n) for n in mesh]
+        miller = np.stack(np.meshgrid(*frequencies, indexing='ij'), axis=-1)
+        m_squared = np.sum(np.matmul(miller, np.linalg.inv(self.__lattice).T)**2, axis=-1)
+        kernel = np.zeros_like(m_squared)
+        nonzero = m_squared > 0
+        kernel[nonzero] = (np.exp(-np.pi**2 * m_squared[nonzero] / self.__alpha**2)
+                           / (np.pi * self.__volume * m_squared[nonzero]))
+
+        values = bspline(0.0, order)[0][1:]
+        for axis, n in enumerate(mesh):
+            phases = np.exp(2j * np.pi * np.outer(np.arange(n), np.arange(order - 1)) / n)
+            moduli = 1.0 / np.abs(np.matmul(phases, values))**2
+            shape = [1, 1, 1]
+            shape[axis] = n
+            kernel = kernel * moduli.reshape(shape)
+        return kernel
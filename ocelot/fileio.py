@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+# file: fileio.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module fileio
+
+  Bulk readers and writers of structure files, working on whole arrays
+  (atomic numbers and coordinates) instead of Atom objects.
+'''
+
+from contextlib import contextmanager
+from io import BytesIO
+import sys
+import numpy as np
+from .constants import element_labels, numbers_to_symbols, symbols_to_numbers
+
+
+def atomic_numbers(symbols):
+    '''
+        Convert an array of chemical symbols (e.g. ['C', 'H', 'H'], str or bytes) to atomic numbers.
+    '''
+    return symbols_to_numbers(symbols).reshape(-1)
+
+
+def read_xyz_atoms(stream, number_of_atoms):
+    '''
+        Read number_of_atoms lines "symbol x y z [extra columns]" from a file-like object.
+        Extra columns (forces, charges, ...) are ignored.
+        Return arrays with atomic numbers and coordinates.
+    '''
+    if number_of_atoms == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros([0, 3])
+    import pandas as pd
+    block = pd.read_csv(stream, sep=r'\s+', header=None, usecols=[0, 1, 2, 3], nrows=number_of_atoms,
+                        dtype={0: str, 1: np.float64, 2: np.float64, 3: np.float64})
+    if block.shape[0] != number_of_atoms:
+        raise Exception("Expected {} atoms in xyz block, found {}.".format(number_of_atoms, block.shape[0]))
+    elements = atomic_numbers(block[0].to_numpy())
+    coordinates = block[[1, 2, 3]].to_numpy(dtype=np.float64)
+    return elements, coordinates
+
+
+def read_xyz(filename):
+    '''
+        Read the first frame of a xyz file.
+        Return arrays with atomic numbers and coordinates, and the comment line.
+    '''
+    with open(filename, 'rb') as stream:
+        number_of_atoms = int(stream.readline())
+        comment = stream.readline().decode('utf-8').strip()
+        elements, coordinates = read_xyz_atoms(stream, number_of_atoms)
+    return elements, coordinates, comment
+
+
+def parse_xyz_frame(data):
+    '''
+        Parse one xyz frame stored in a bytes object.
+        Return arrays with atomic numbers and coordinates, and the comment line.
+    '''
+    stream = BytesIO(data)
+    number_of_atoms = int(stream.readline())
+    comment = stream.readline().decode('utf-8').strip()
+    tokens = data[stream.tell():].split()
+    if len(tokens) == 4 * number_of_atoms:
+        # plain "symbol x y z" lines: a single split is faster than read_csv for small frames
+        block = np.array(tokens).reshape(number_of_atoms, 4)
+        elements = atomic_numbers(block[:, 0])
+        coordinates = block[:, 1:].astype(np.float64)
+    else:
+        elements, coordinates = read_xyz_atoms(stream, number_of_atoms)
+    return elements, coordinates, comment
+
+
+def skip_lines(data, offset, number_of_lines, window=1 << 16):
+    '''
+        Return the offset after number_of_lines lines, starting at offset of a uint8 array,
+        and the window size used (a guess for the next call). Newlines are counted with numpy
+        in windows, so memory use does not grow with the file size.
+    '''
+    size = data.shape[0]
+    if number_of_lines == 0:
+        return offset, window
+    while True:
+        newlines = np.flatnonzero(data[offset:offset + window] == ord('\n'))
+        if newlines.shape[0] >= number_of_lines or offset + window >= size:
+            break
+        window *= 2
+    if newlines.shape[0] >= number_of_lines:
+        return offset + int(newlines[number_of_lines - 1]) + 1, window
+    return size, window
+
+
+def xyz_frame_offsets(buffer):
+    '''
+        Return the byte offsets of the frames of a multi-frame xyz file stored in buffer
+        (bytes or memory map), with the buffer size appended as last offset.
+    '''
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    size = data.shape[0]
+    offsets = []
+    offset = 0
+    window = 1 << 16
+    while offset < size:
+        end_of_line = buffer.find(b'\n', offset)
+        if end_of_line == -1:
+            end_of_line = size
+        header = bytes(buffer[offset:end_of_line]).strip()
+        if not header:
+            offset = end_of_line + 1
+            continue
+        offsets.append(offset)
+        offset, window = skip_lines(data, offset, int(header) + 2, window)
+    offsets.append(size)
+    return np.array(offsets, dtype=np.int64)
+
+
+def species_symbol(name):
+    '''
+        Return the chemical symbol of a VASP species name (e.g. 'Fe_pv' or 'Fe/1a2b' => 'Fe').
+    '''
+    return name.split('_')[0].split('/')[0]
+
+
+def read_poscar_header(stream):
+    '''
+        Read the header of a POSCAR or XDATCAR file (comment, scale factor, Bravais vectors,
+        species and counts) from a binary stream.
+        Return lattice constant, Bravais vectors (3x3 array), atomic numbers of all atoms, and the
+        scale factor of each Cartesian direction (to be applied to Cartesian coordinates).
+    '''
+    comment = stream.readline().decode('utf-8')
+    scale = np.array(stream.readline().split()[:3], dtype=np.float64)
+    bravais_vector = np.array([stream.readline().split()[:3] for index in range(3)], dtype=np.float64)
+    if scale.shape[0] == 3:
+        # one scale factor per Cartesian direction (VASP 6)
+        bravais_vector = bravais_vector * scale
+        lattice_constant = 1.0
+        axis_scale = scale
+    elif scale[0] < 0.0:
+        # negative scale factor is the cell volume
+        lattice_constant = (-scale[0] / abs(np.linalg.det(bravais_vector))) ** (1.0 / 3.0)
+        axis_scale = np.full(3, lattice_constant)
+    else:
+        lattice_constant = float(scale[0])
+        axis_scale = np.full(3, lattice_constant)
+
+    tokens = stream.readline().decode('utf-8').split()
+    if tokens and tokens[0].isdigit():
+        # VASP 4 format: no species line, try the symbols in the comment line
+        counts = [int(token) for token in tokens]
+        symbols = comment.split()[:len(counts)]
+    else:
+        symbols = [species_symbol(token) for token in tokens]
+        counts = [int(token) for token in stream.readline().split()]
+    if len(symbols) != len(counts):
+        raise Exception("Chemical species are not defined in POSCAR header.")
+    elements = np.repeat(atomic_numbers(symbols), counts)
+    return lattice_constant, bravais_vector, elements, axis_scale
+
+
+def read_poscar(filename):
+    '''
+        Read a POSCAR (or CONTCAR) file.
+        Return lattice constant, Bravais vectors, atomic numbers, coordinates, a flag with
+        True for direct (crystallographic) coordinates, and the selective dynamics flags
+        (N x 3 boolean array, or None).
+        Cartesian coordinates are returned multiplied by the scale factor(s).
+    '''
+    import pandas as pd
+    with open(filename, 'rb') as stream:
+        lattice_constant, bravais_vector, elements, scale = read_poscar_header(stream)
+        line = stream.readline().strip()
+        selective = line[:1] in (b'S', b's')
+        if selective:
+            line = stream.readline().strip()
+        crystallographic = line[:1] not in (b'C', b'c', b'K', b'k')
+        number_of_atoms = elements.shape[0]
+        columns = [0, 1, 2, 3, 4, 5] if selective else [0, 1, 2]
+        block = pd.read_csv(stream, sep=r'\s+', header=None, usecols=columns, nrows=number_of_atoms)
+    if block.shape[0] != number_of_atoms:
+        raise Exception("Expected {} atoms in POSCAR, found {}.".format(number_of_atoms, block.shape[0]))
+    coordinates = block[[0, 1, 2]].to_numpy(dtype=np.float64)
+    if not crystallographic:
+        coordinates = coordinates * scale
+    flags = None
+    if selective:
+        flags = block[[3, 4, 5]].astype(str).apply(lambda column: column.str.upper().str.startswith('T'))
+        flags = flags.to_numpy(dtype=bool)
+    return lattice_constant, bravais_vector, elements, coordinates, crystallographic, flags
+
+
+def xdatcar_frame_offsets(buffer):
+    '''
+        Return the byte offsets of the configuration lines ("Direct configuration= ...")
+        of a XDATCAR file stored in buffer, with the buffer size appended, and the offset
+        of the header that applies to each configuration (headers are repeated in
+        variable cell XDATCAR files).
+    '''
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    offsets, headers = [], []
+    header = 0
+    frame_end = None
+    window = 1 << 16
+    position = 0
+    while True:
+        found = buffer.find(b'configuration', position)
+        if found == -1:
+            break
+        line_start = buffer.rfind(b'\n', 0, found) + 1
+        if frame_end is None or bytes(buffer[frame_end:line_start]).strip():
+            header = 0 if frame_end is None else frame_end
+            number_of_atoms = read_poscar_header(BytesIO(bytes(buffer[header:line_start])))[2].shape[0]
+        offsets.append(line_start)
+        headers.append(header)
+        frame_end, window = skip_lines(data, line_start, number_of_atoms + 1, window)
+        position = frame_end
+    offsets.append(data.shape[0])
+    return np.array(offsets, dtype=np.int64), np.array(headers, dtype=np.int64)
+
+
+@contextmanager
+def output_stream(destination=None, mode='w'):
+    '''
+        Context manager returning a writable text stream: sys.stdout if destination is None,
+        destination itself if it is a file-like object, or the file opened with mode.
+    '''
+    if destination is None:
+        yield sys.stdout
+    elif hasattr(destination, 'write'):
+        yield destination
+    else:
+        with open(destination, mode, encoding='utf-8') as stream:
+            yield stream
+
+
+def write_rows(stream, row_format, columns, chunk_size=65536):
+    '''
+        Write rows formatted with row_format (printf style) from a list of column arrays
+        (1D or 2D). Each chunk of rows is formatted with a single string operation.
+    '''
+    columns = [np.asarray(column) for column in columns]
+    # explicit widths: reshape(n, -1) is ambiguous for zero rows
+    columns = [column.reshape(column.shape[0], int(np.prod(column.shape[1:]))) for column in columns]
+    number_of_rows = columns[0].shape[0]
+    width = sum(column.shape[1] for column in columns)
+    for start in range(0, number_of_rows, chunk_size):
+        stop = min(start + chunk_size, number_of_rows)
+        block = np.empty([stop - start, width], dtype=object)
+        position = 0
+        for column in columns:
+            block[:, position:position + column.shape[1]] = column[start:stop]
+            position += column.shape[1]
+        stream.write((row_format * (stop - start)) % tuple(block.ravel().tolist()))
+
+
+def write_xyz(destination, elements, coordinates, comment='', mode='w'):
+    '''
+        Write one xyz frame to destination (file name, file-like object, or None for stdout).
+        Use mode='a' to append a frame to a trajectory file.
+    '''
+    labels = element_labels[np.asarray(elements, dtype=np.int64)]
+    with output_stream(destination, mode) as stream:
+        stream.write("{}\n{}\n".format(labels.shape[0], comment))
+        write_rows(stream, "%s  %.8f  %.8f  %.8f\n", [labels, coordinates])
+
+
+def write_poscar(destination, elements, fractional_coordinates, lattice_constant, bravais_vector,
+                 comment="POSCAR file generated by ocelot", selective_dynamics=None, mode='w'):
+    '''
+        Write a POSCAR file (VASP format) with direct coordinates. Atoms of the same species
+        should be contiguous (e.g. sorted by atomic number).
+        selective_dynamics (optional): N x 3 boolean array of relaxation flags.
+    '''
+    elements = np.asarray(elements, dtype=np.int64)
+    species_changes = np.flatnonzero(np.diff(elements)) + 1
+    species = elements[np.concatenate([[0], species_changes])] if elements.shape[0] else elements
+    counts = np.diff(np.concatenate([[0], species_changes, [elements.shape[0]]]))
+    with output_stream(destination, mode) as stream:
+        stream.write("{}\n  {:.8f}\n".format(comment, lattice_constant))
+        write_rows(stream, "    %.8f  %.8f  %.8f\n", [np.asarray(bravais_vector, dtype=np.float64)])
+        stream.write("    {}\n".format("  ".join(numbers_to_symbols(species))))
+        stream.write("    {}\n".format("  ".join(str(count) for count in counts)))
+        if selective_dynamics is None:
+            stream.write("Direct\n")
+            write_rows(stream, "  %.8f  %.8f  %.8f\n", [fractional_coordinates])
+        else:
+            flags = np.where(np.asarray(selective_dynamics, dtype=bool), 'T', 'F').astype(object)
+            stream.write("Selective dynamics\nDirect\n")
+            write_rows(stream, "  %.8f  %.8f  %.8f  %s  %s  %s\n", [fractional_coordinates, flags])
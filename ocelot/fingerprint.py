@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# file: fingerprint.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module fingerprint
+'''
+
+from functools import reduce
+from itertools import product
+from math import gcd
+import numpy as np
+from .core import Material
+from .analysis import pair_distances
+
+
+def fingerprint(chemical, rmax=6.0, bins=60):
+    '''
+        Return a (composition, vector) fingerprint, invariant under rotations, translations and
+        permutations of the atoms.
+
+        composition is a tuple of (Z, count) pairs; for a Material the counts are divided by their
+        greatest common divisor, so supercells of the same crystal share a fingerprint.
+        vector concatenates, for each element pair (Z_a <= Z_b), the histogram of pair distances
+        up to rmax per atom. Each distance is split linearly between the two nearest bin centers,
+        so the vector changes continuously with the coordinates.
+    '''
+    elements = np.asarray(chemical.elements)
+    species, inverse, counts = np.unique(elements, return_inverse=True, return_counts=True)
+    s = species.shape[0]
+    if isinstance(chemical, Material) and s > 0:
+        counts = counts // reduce(gcd, counts.tolist())
+    composition = tuple(zip(species.tolist(), counts.tolist()))
+
+    i, j, distances = pair_distances(chemical, rmax)
+    keep = (distances > 0.0) & (distances < rmax)
+    a, b = inverse[i[keep]], inverse[j[keep]]
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    # index of the unordered species pair (a <= b) in the upper triangle
+    pair = a * s - a * (a - 1) // 2 + (b - a)
+    position = distances[keep] * (bins / rmax) - 0.5
+    lower = np.floor(position).astype(np.int64)
+    upper_weight = position - lower
+    size = s * (s + 1) // 2 * bins
+    vector = np.zeros(size)
+    for offset, weight in ((lower, 1.0 - upper_weight), (lower + 1, upper_weight)):
+        inside = (offset >= 0) & (offset < bins)
+        vector += np.bincount(pair[inside] * bins + offset[inside], weight[inside], minlength=size)
+    return composition, vector / max(elements.shape[0], 1)
+
+
+class FingerprintIndex(object):
+    '''
+        Hash index of structure fingerprints to find near-duplicates in (roughly) linear time.
+
+        Two structures are duplicates if they have the same composition and their fingerprint vectors
+        are closer than tolerance (Euclidean distance). Vectors are projected on a few random unit
+        directions and bucketed with the tolerance as bucket width; since projections never increase
+        distances, duplicates always fall in neighboring buckets, and only those are compared.
+
+            index = FingerprintIndex(tolerance=0.01)
+            unique = index.deduplicate(candidates)   # positions of the first of each set of duplicates
+    '''
+    def __init__(self, tolerance=1e-2, rmax=6.0, bins=60, projections=3, seed=0):
+        '''
+            FingerprintIndex object constructor.
+        '''
+        self.__tolerance = tolerance
+        self.__rmax = rmax
+        self.__bins = bins
+        self.__projections = projections
+        self.__seed = seed
+        self.__directions = {}
+        self.__buckets = {}
+        self.__vectors = []
+        self.__neighborhood = np.array(list(product((-1, 0, 1), repeat=projections)), dtype=np.int64)
+
+    @property
+    def tolerance(self):
+        return self.__tolerance
+
+    @property
+    def rmax(self):
+        return self.__rmax
+
+    @property
+    def bins(self):
+        return self.__bins
+
+    def __len__(self):
+        return len(self.__vectors)
+
+    def __directions_for(self, size):
+        if size not in self.__directions:
+            directions = np.random.default_rng(self.__seed).standard_normal((self.__projections, size))
+            self.__directions[size] = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+        return self.__directions[size]
+
+    def __bucket(self, vector):
+        return np.floor(np.matmul(self.__directions_for(vector.shape[0]), vector) / self.__tolerance).astype(np.int64)
+
+    def fingerprint(self, chemical):
+        return fingerprint(chemical, self.__rmax, self.__bins)
+
+    def query(self, chemical, fingerprint=None):
+        '''
+            Return the indices of the stored structures within tolerance of chemical.
+        '''
+        composition, vector = self.fingerprint(chemical) if fingerprint is None else fingerprint
+        bucket = self.__bucket(vector)
+        candidates = []
+        for shift in self.__neighborhood:
+            candidates.extend(self.__buckets.get((composition, tuple(bucket + shift)), ()))
+        if not candidates:
+            return []
+        candidates = np.array(candidates)
+        stored = np.array([self.__vectors[k] for k in candidates])
+        close = np.linalg.norm(stored - vector, axis=1) < self.__tolerance
+        return sorted(candidates[close].tolist())
+
+    def add(self, chemical, fingerprint=None):
+        '''
+            Store the fingerprint of chemical and return its index.
+        '''
+        composition, vector = self.fingerprint(chemical) if fingerprint is None else fingerprint
+        key = (composition, tuple(self.__bucket(vector)))
+        self.__buckets.setdefault(key, []).append(len(self.__vectors))
+        self.__vectors.append(vector)
+        return len(self.__vectors) - 1
+
+    def deduplicate(self, chemicals):
+        '''
+            Return the positions (in chemicals) of the structures without a duplicate among the
+            structures stored before them. Only those are added to the index.
+        '''
+        unique = []
+        for position, chemical in enumerate(chemicals):
+            key = self.fingerprint(chemical)
+            if not self.query(chemical, key):
+                self.add(chemical, key)
+                unique.append(position)
+        return unique
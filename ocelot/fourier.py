@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# file: fourier.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module fourier
+'''
+
+
+def fft_size(n):
+    '''
+        Smallest integer >= n whose only prime factors are 2, 3 and 5 (FFT-friendly size).
+    '''
+    size = max(int(n), 1)
+    while True:
+        remainder = size
+        for factor in (2, 3, 5):
+            while remainder % factor == 0:
+                remainder //= factor
+        if remainder == 1:
+            return size
+        size += 1
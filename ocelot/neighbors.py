@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# file: neighbors.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module neighbors
+
+  Neighbor search with KD-trees (scipy.spatial.cKDTree). All functions work on arrays
+  of atomic numbers and cartesian coordinates, so they can be shared by Molecule,
+  Material and the topology methods.
+'''
+
+import numpy as np
+from .constants import covalent_radius
+
+
+def pairs_within(coordinates, cutoff, sort=True):
+    '''
+        Return arrays (i, j) with all pairs of points closer than cutoff, with i < j.
+        Pairs are sorted by i and then by j (unless sort=False).
+    '''
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+    if coordinates.shape[0] < 2 or cutoff <= 0.0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    from scipy.spatial import cKDTree
+    tree = cKDTree(coordinates)
+    pairs = tree.query_pairs(cutoff, output_type='ndarray').astype(np.int64)
+    if sort:
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    return pairs[:, 0], pairs[:, 1]
+
+
+def covalent_bonds(elements, coordinates, tolerance=0.2):
+    '''
+        Return arrays (i, j, distance) of bonded atoms, with i < j.
+        Atoms i and j are bonded if 0 < d_ij < (1+tolerance)*(R_i + R_j),
+        with R_i the covalent radius of atom i.
+    '''
+    elements = np.asarray(elements, dtype=np.int64)
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+    radii = covalent_radius[elements]
+    if radii.shape[0] < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    # largest possible bond length among the elements present
+    cutoff = 2.0 * radii.max() * (1 + tolerance)
+    i, j = pairs_within(coordinates, cutoff)
+    distances = np.linalg.norm(coordinates[i] - coordinates[j], axis=1)
+    bonded = (distances < (1 + tolerance) * (radii[i] + radii[j])) & (distances > 0.0)
+    return i[bonded], j[bonded], distances[bonded]
+
+
+class NeighborList(object):
+    '''
+        Neighbor list in compressed sparse row (CSR) layout.
+
+        Pair p goes from atom first[p] to atom second[p] in the periodic image shifted by
+        images[p] (integer multiples of the Bravais vectors), with distance vector
+        vectors[p] = r_second + images @ lattice - r_first. Pairs are sorted by first atom,
+        so neighbors of atom i are stored in slice offsets[i]:offsets[i+1].
+    '''
+    def __init__(self, number_of_atoms, first, second, images, vectors):
+        '''
+            NeighborList object constructor.
+        '''
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        sorting = np.lexsort((second, first))
+        self.__first = first[sorting]
+        self.__second = second[sorting]
+        self.__images = np.asarray(images, dtype=np.int64).reshape(-1, 3)[sorting]
+        self.__vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)[sorting]
+        self.__offsets = np.zeros(number_of_atoms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.__first, minlength=number_of_atoms), out=self.__offsets[1:])
+
+    def __len__(self):
+        return self.__first.shape[0]
+
+    @property
+    def number_of_atoms(self):
+        return self.__offsets.shape[0] - 1
+
+    @property
+    def first(self):
+        return self.__first
+
+    @property
+    def second(self):
+        return self.__second
+
+    @property
+    def images(self):
+        return self.__images
+
+    @property
+    def vectors(self):
+        return self.__vectors
+
+    @property
+    def distances(self):
+        return np.linalg.norm(self.__vectors, axis=1)
+
+    @property
+    def offsets(self):
+        return self.__offsets
+
+    def neighbors(self, index):
+        '''
+            Return the indices of the neighbors of atom "index".
+        '''
+        return self.__second[self.__offsets[index]:self.__offsets[index + 1]]
+
+    def coordination(self):
+        '''
+            Return the number of neighbors of each atom.
+        '''
+        return np.diff(self.__offsets)
+
+
+def image_shifts(lattice, cutoff):
+    '''
+        Return the integer image shifts (n_1, n_2, n_3) needed to find all neighbors within
+        cutoff of atoms wrapped into the unit cell, keeping only one of each pair (n, -n).
+    '''
+    lattice = np.asarray(lattice, dtype=np.float64)
+    volume = np.abs(np.linalg.det(lattice))
+    # distance between lattice planes spanned by the other two vectors
+    areas = np.linalg.norm(np.cross(lattice[[1, 2, 0]], lattice[[2, 0, 1]]), axis=1)
+    ranges = np.ceil(cutoff * areas / volume).astype(np.int64)
+    axes = [np.arange(-n, n + 1) for n in ranges]
+    shifts = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+    # keep shifts lexicographically positive
+    sign = 4 * np.sign(shifts[:, 0]) + 2 * np.sign(shifts[:, 1]) + np.sign(shifts[:, 2])
+    return shifts[sign > 0]
+
+
+def periodic_pairs(coordinates, cutoff, lattice):
+    '''
+        Return arrays (first, second, images, vectors) with every pair of atoms closer than cutoff
+        in a periodic cell listed once (unsorted), with vectors = r_second + images @ lattice - r_first.
+        Atoms interacting with their own periodic images are included (first == second).
+    '''
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+    lattice = np.asarray(lattice, dtype=np.float64)
+    fractional = np.matmul(coordinates, np.linalg.inv(lattice))
+    cell_shift = np.floor(fractional).astype(np.int64)
+    wrapped = np.matmul(fractional - cell_shift, lattice)
+
+    from scipy.spatial import cKDTree
+    first, second, images = [], [], []
+    tree = cKDTree(wrapped)
+
+    # pairs inside the home cell
+    i, j = pairs_within(wrapped, cutoff, sort=False)
+    first.append(i)
+    second.append(j)
+    images.append(np.zeros([i.shape[0], 3], dtype=np.int64))
+
+    # pairs with a shifted image (each shift n also gives the reversed pair with -n)
+    for shift in image_shifts(lattice, cutoff):
+        shifted = cKDTree(wrapped + np.matmul(shift, lattice))
+        pairs = tree.sparse_distance_matrix(shifted, cutoff, output_type='ndarray')
+        first.append(pairs['i'].astype(np.int64))
+        second.append(pairs['j'].astype(np.int64))
+        images.append(np.repeat(shift[np.newaxis, :], pairs.shape[0], axis=0))
+
+    first = np.concatenate(first)
+    second = np.concatenate(second)
+    images = np.concatenate(images)
+    vectors = wrapped[second] + np.matmul(images, lattice) - wrapped[first]
+
+    # image shifts relative to the original (unwrapped) coordinates
+    images += cell_shift[first] - cell_shift[second]
+    return first, second, images, vectors
+
+
+def neighbor_list(coordinates, cutoff, lattice=None):
+    '''
+        Return a NeighborList with all pairs of atoms closer than cutoff (both directions).
+
+        If lattice (rows are Bravais vectors, cartesian units) is given, periodic images are
+        included: triclinic cells and cutoffs larger than the cell are supported by searching
+        every image shift needed, without building a supercell.
+    '''
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+    number_of_atoms = coordinates.shape[0]
+
+    if lattice is None:
+        i, j = pairs_within(coordinates, cutoff)
+        vectors = coordinates[j] - coordinates[i]
+        images = np.zeros([2 * i.shape[0], 3], dtype=np.int64)
+        return NeighborList(number_of_atoms, np.concatenate([i, j]), np.concatenate([j, i]),
+                            images, np.concatenate([vectors, -vectors]))
+
+    first, second, images, vectors = periodic_pairs(coordinates, cutoff, lattice)
+    return NeighborList(number_of_atoms,
+                        np.concatenate([first, second]),
+                        np.concatenate([second, first]),
+                        np.concatenate([images, -images]),
+                        np.concatenate([vectors, -vectors]))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# file: topology.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module topology
+
+  Bond graph stored as a sparse adjacency matrix, with vectorized enumeration of
+  angles, proper dihedrals and improper torsions as integer index arrays.
+'''
+
+import numpy as np
+
+
+def later_entries(positions, row_ends):
+    '''
+        For each CSR position p (with row ending at row_ends[p]), pair it with every later
+        position q of the same row. Return arrays (index of p in positions, q).
+    '''
+    counts = row_ends - positions - 1
+    counts[counts < 0] = 0
+    source = np.repeat(np.arange(positions.shape[0]), counts)
+    group_start = np.repeat(np.cumsum(counts) - counts, counts)
+    later = positions[source] + 1 + (np.arange(source.shape[0]) - group_start)
+    return source, later
+
+
+class Topology(object):
+    '''
+        Bond graph of a set of atoms, built once from arrays of bonded pairs (i, j).
+        The adjacency matrix is symmetric and stored in CSR format, so the neighbors of
+        atom i are indices[indptr[i]:indptr[i+1]] (sorted).
+    '''
+    def __init__(self, number_of_atoms, first, second):
+        '''
+            Topology object constructor.
+        '''
+        from scipy.sparse import coo_matrix
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        rows = np.concatenate([first, second])
+        columns = np.concatenate([second, first])
+        adjacency = coo_matrix((np.ones(rows.shape[0], dtype=np.int8), (rows, columns)),
+                               shape=(number_of_atoms, number_of_atoms)).tocsr()
+        adjacency.sum_duplicates()
+        adjacency.sort_indices()
+        self.__adjacency = adjacency
+
+    @property
+    def adjacency(self):
+        return self.__adjacency
+
+    @property
+    def number_of_atoms(self):
+        return self.__adjacency.shape[0]
+
+    @property
+    def indptr(self):
+        return self.__adjacency.indptr.astype(np.int64)
+
+    @property
+    def indices(self):
+        return self.__adjacency.indices.astype(np.int64)
+
+    def degrees(self):
+        '''
+            Return the number of bonds of each atom.
+        '''
+        return np.diff(self.indptr)
+
+    def bonds(self):
+        '''
+            Return arrays (i, j) of bonded atoms, with i < j.
+        '''
+        rows = np.repeat(np.arange(self.number_of_atoms), self.degrees())
+        upper = rows < self.indices
+        return rows[upper], self.indices[upper]
+
+    def angles(self):
+        '''
+            Return arrays (center, neighbor 1, neighbor 2) of all bond angles,
+            with neighbor 1 > neighbor 2.
+        '''
+        indptr, indices = self.indptr, self.indices
+        rows = np.repeat(np.arange(self.number_of_atoms), np.diff(indptr))
+        positions = np.arange(indices.shape[0])
+        source, later = later_entries(positions, indptr[rows + 1])
+        return rows[source], indices[later], indices[positions[source]]
+
+    def dihedrals(self):
+        '''
+            Return arrays (i, j, k, l) of all proper dihedrals i-j-k-l, with j < k.
+            Three-membered rings (i == l) are excluded.
+        '''
+        indptr, indices = self.indptr, self.indices
+        degrees = np.diff(indptr)
+        j, k = self.bonds()
+        counts = degrees[j] * degrees[k]
+        bond = np.repeat(np.arange(j.shape[0]), counts)
+        local = np.arange(bond.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+        i = indices[indptr[j[bond]] + local // degrees[k[bond]]]
+        l = indices[indptr[k[bond]] + local % degrees[k[bond]]]
+        j, k = j[bond], k[bond]
+        valid = (i != k) & (l != j) & (i != l)
+        return i[valid], j[valid], k[valid], l[valid]
+
+    def impropers(self):
+        '''
+            Return arrays (center, neighbor 1, neighbor 2, neighbor 3) for every combination
+            of three neighbors of atoms with three or more bonds (neighbor 1 < 2 < 3).
+        '''
+        indptr, indices = self.indptr, self.indices
+        rows = np.repeat(np.arange(self.number_of_atoms), np.diff(indptr))
+        positions = np.arange(indices.shape[0])
+        row_ends = indptr[rows + 1]
+        source, second = later_entries(positions, row_ends)
+        first = positions[source]
+        source, third = later_entries(second, row_ends[second])
+        first, second = first[source], second[source]
+        return rows[first], indices[first], indices[second], indices[third]
+
+
+def bond_angles(coordinates, center, neighbor1, neighbor2):
+    '''
+        Return angles (in degrees) neighbor1-center-neighbor2 and the unit normal vectors
+        of each angle plane.
+    '''
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    u1 = coordinates[center] - coordinates[neighbor1]
+    u2 = coordinates[center] - coordinates[neighbor2]
+    u1 /= np.linalg.norm(u1, axis=1)[:, np.newaxis]
+    u2 /= np.linalg.norm(u2, axis=1)[:, np.newaxis]
+    cross = np.cross(u1, u2)
+    sine = np.linalg.norm(cross, axis=1)
+    cosine = np.einsum('ij,ij->i', u1, u2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normals = cross / sine[:, np.newaxis]
+    return np.degrees(np.arctan2(sine, cosine)), normals
+
+
+def torsion_angles(coordinates, i, j, k, l):
+    '''
+        Return signed torsion angles (in degrees, between -180 and 180) of the sequences i-j-k-l,
+        i.e., the angle between planes (i, j, k) and (j, k, l).
+    '''
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    b1 = coordinates[j] - coordinates[i]
+    b2 = coordinates[k] - coordinates[j]
+    b3 = coordinates[l] - coordinates[k]
+    n1 = np.cross(b1, b2)
+    n2 = np.cross(b2, b3)
+    y = np.linalg.norm(b2, axis=1) * np.einsum('ij,ij->i', b1, n2)
+    x = np.einsum('ij,ij->i', n1, n2)
+    return np.degrees(np.arctan2(y, x))
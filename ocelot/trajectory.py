@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# file: trajectory.py
+
+# This code is part of Ocelot.
+#
+# Copyright (c) 2020 Leandro Seixas Rocha.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''
+  Module trajectory
+'''
+
+from io import BytesIO
+import mmap
+import os
+import numpy as np
+from .core import AtomArrays, Material, Molecule
+from .fileio import parse_xyz_frame, read_poscar_header, xdatcar_frame_offsets, xyz_frame_offsets
+
+
+class Trajectory(object):
+    '''
+        Reader of multi-frame (concatenated) xyz files, such as molecular dynamics trajectories.
+
+        The file is memory mapped and the byte offset of each frame is stored in an index file
+        (by default filename + '.index.npz'), built on first use. Frames are read on demand:
+
+            trajectory = Trajectory('md.xyz')
+            molecule = trajectory[100]          # random access
+            for molecule in trajectory:         # lazy iteration
+                ...
+    '''
+    def __init__(self, filename, index_file=None):
+        '''
+            Trajectory object constructor.
+        '''
+        self.__filename = filename
+        if index_file is None:
+            index_file = filename + '.index.npz'
+        self.__index_file = index_file
+        self.__index = None
+
+    @property
+    def filename(self):
+        return self.__filename
+
+    @property
+    def index_file(self):
+        return self.__index_file
+
+    @property
+    def index(self):
+        if self.__index is None:
+            self.__index = self.__load_index()
+        return self.__index
+
+    @property
+    def offsets(self):
+        return self.index['offsets']
+
+    def __load_index(self):
+        status = os.stat(self.__filename)
+        if os.path.exists(self.__index_file):
+            with np.load(self.__index_file) as stored:
+                index = {key: stored[key] for key in stored.files}
+            if index['offsets'][-1] == status.st_size and index.pop('mtime') == status.st_mtime_ns:
+                return index
+        if status.st_size == 0:
+            index = {'offsets': np.zeros(1, dtype=np.int64)}
+        else:
+            with open(self.__filename, 'rb') as stream:
+                with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    index = self.build_index(buffer)
+        try:
+            # through a file object: np.savez would append '.npz' to other file names
+            with open(self.__index_file, 'wb') as stream:
+                np.savez(stream, mtime=status.st_mtime_ns, **index)
+        except OSError:
+            pass
+        return index
+
+    def build_index(self, buffer):
+        '''
+            Scan the file (memory map) and return a dictionary of index arrays,
+            with the byte offsets of all frames in 'offsets'.
+        '''
+        return {'offsets': xyz_frame_offsets(buffer)}
+
+    def read_frame(self, buffer, index):
+        '''
+            Parse frame "index" from the memory map of the file.
+        '''
+        offsets = self.offsets
+        elements, coordinates, comment = parse_xyz_frame(buffer[offsets[index]:offsets[index + 1]])
+        return Molecule(AtomArrays(elements=elements, coordinates=coordinates))
+
+    def append(self, chemical, comment=''):
+        '''
+            Append a Molecule (or Material) object as a new frame at the end of the file.
+        '''
+        chemical.write_xyz(self.__filename, comment=comment, mode='a')
+        self.__index = None
+
+    def __len__(self):
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.frames(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Frame index out of range.")
+        return next(self.frames(index, index + 1))
+
+    def __iter__(self):
+        return self.frames()
+
+    def frames(self, start=0, stop=None, step=1):
+        '''
+            Generator of frames start, start+step, ..., up to stop.
+            Only one frame is held in memory at a time.
+        '''
+        if stop is None:
+            stop = len(self)
+        if start >= stop and step > 0:
+            return
+        with open(self.__filename, 'rb') as stream:
+            with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for index in range(start, stop, step):
+                    yield self.read_frame(buffer, index)
+
+
+class XdatcarTrajectory(Trajectory):
+    '''
+        Reader of VASP XDATCAR files (constant or variable cell), with the same interface as
+        Trajectory. Frames are Material objects with crystallographic coordinates.
+
+            trajectory = XdatcarTrajectory('XDATCAR')
+            material = trajectory[-1]
+    '''
+    def __init__(self, filename, index_file=None):
+        '''
+            XdatcarTrajectory object constructor.
+        '''
+        Trajectory.__init__(self, filename, index_file)
+        self.__header = (None, None)
+
+    def build_index(self, buffer):
+        offsets, headers = xdatcar_frame_offsets(buffer)
+        return {'offsets': offsets, 'headers': headers}
+
+    def read_frame(self, buffer, index):
+        import pandas as pd
+        offsets, headers = self.offsets, self.index['headers']
+        if self.__header[0] != headers[index]:
+            # headers are shared by all frames of constant cell files
+            first_frame = np.searchsorted(headers, headers[index])
+            header_data = BytesIO(bytes(buffer[headers[index]:offsets[first_frame]]))
+            self.__header = (headers[index], read_poscar_header(header_data))
+        lattice_constant, bravais_vector, elements, scale = self.__header[1]
+
+        stream = BytesIO(bytes(buffer[offsets[index]:offsets[index + 1]]))
+        stream.readline()
+        block = pd.read_csv(stream, sep=r'\s+', header=None, usecols=[0, 1, 2], nrows=elements.shape[0])
+        arrays = AtomArrays(elements=elements, coordinates=block.to_numpy(dtype=np.float64))
+        return Material(arrays, lattice_constant=lattice_constant, bravais_vector=bravais_vector.copy(),
+                        crystallographic=True)
+
+    def append(self, chemical, comment=''):
+        raise Exception("Appending frames is not supported for XDATCAR files.")
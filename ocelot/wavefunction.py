@@ -21,48 +21,615 @@
   Module wavefunction
 '''
 
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import fft
+from scipy.sparse.linalg import LinearOperator, lobpcg
+from .constants import bohr_radius, hartree
+from .core import Material
+from .fourier import fft_size
+
+# Energy unit conversion to Hartree
+energy_units = {'Ha': 1.0, 'Ry': 0.5, 'eV': 1.0 / hartree}
+
+
 class KGrid(Material):
     '''
         k points sample in Brillouin Zone for a Material object.
         By default, using Monkhorst-Pack algorithm [Phys. Rev. B 13, 5188 (1976)].
+
+        The mesh is defined by the diagonal of matrix (number of k points along each reciprocal
+        vector) and a shift (in units of the mesh spacing). With gamma_centered=True, the mesh
+        includes the Gamma point for any number of points.
+
+        Example:
+            kgrid = KGrid(material, matrix=np.diag([8, 8, 1]))
+            kpoints, weights = kgrid.irreducible_kpoints()
     '''
-    def __init__(self, matrix = np.eye(3), shift = np.array([0,0,0])):
+    def __init__(self, material, matrix=np.eye(3), shift=np.array([0, 0, 0]), gamma_centered=False):
         '''
             KGrid object constructor.
         '''
+        Material.__init__(self, material.arrays, material.lattice_constant, material.bravais_vector,
+                          material.crystallographic)
+        matrix = np.array(matrix)
+        if not np.allclose(matrix, np.diag(np.diag(matrix))):
+            raise Exception("Only diagonal k grid matrices are supported.")
         self.__matrix = matrix
-        self.__shift = shift
-        self.__supercell = self.bravais_lattice*self.__matrix
+        self.__shift = np.array(shift, dtype=np.float64)
+        self.__gamma_centered = gamma_centered
+        self.__supercell = self.supercell_lattice(self.__matrix)
+
+    @property
+    def matrix(self):
+        return self.__matrix
+
+    @property
+    def shift(self):
+        return self.__shift
+
+    @property
+    def gamma_centered(self):
+        return self.__gamma_centered
+
+    @property
+    def mesh(self):
+        return np.round(np.diag(self.__matrix)).astype(np.int64)
+
+    def __mesh_origin(self):
+        '''
+            Offset o of the mesh, with k_a = (i_a + o_a)/N_a for i_a = 0, ..., N_a - 1.
+        '''
+        if self.__gamma_centered:
+            return self.__shift
+        # Monkhorst-Pack: k_a = (2r - N_a - 1)/(2 N_a), r = 1, ..., N_a
+        return self.__shift + 0.5 - self.mesh / 2.0
+
+    def kpoints(self):
+        '''
+            Return all k points of the mesh (in units of the reciprocal lattice vectors).
+        '''
+        mesh = self.mesh
+        indices = np.stack(np.meshgrid(*[np.arange(n) for n in mesh], indexing='ij'), axis=-1).reshape(-1, 3)
+        return (indices + self.__mesh_origin()) / mesh
+
+    def cartesian_kpoints(self, kpoints=None):
+        '''
+            Convert k points (by default, the full mesh) to cartesian coordinates.
+        '''
+        if kpoints is None:
+            kpoints = self.kpoints()
+        return np.matmul(kpoints, self.reciprocal_lattice())
+
+    def symmetry_operations(self, tolerance=1e-5):
+        '''
+            Return the point group operations of the crystal, as integer matrices R acting on
+            crystallographic coordinates (f' = R f + t). Operations of the lattice point group
+            are kept if some translation t maps every atom onto an atom of the same element.
+        '''
+        # lattice point group: R^T G R = G, with G the metric tensor
+        candidates = np.array(np.meshgrid(*[[-1, 0, 1]] * 9, indexing='ij')).reshape(9, -1).T.reshape(-1, 3, 3)
+        lattice = self.bravais_lattice
+        metric = np.matmul(lattice, lattice.T)
+        transformed = np.einsum('nji,jk,nkl->nil', candidates, metric, candidates)
+        scale = np.abs(metric).max()
+        operations = candidates[np.all(np.abs(transformed - metric) < tolerance * scale, axis=(1, 2))]
+
+        fractional = self.crystallographic_coordinates()
+        elements = self.elements
+        if fractional.shape[0] == 0:
+            return operations
+        species, counts = np.unique(elements, return_counts=True)
+        reference = np.flatnonzero(elements == species[np.argmin(counts)])
+        same_element = elements[:, np.newaxis] == elements[np.newaxis, :]
+
+        symmetric = []
+        for operation in operations:
+            rotated = np.matmul(fractional, operation.T)
+            for translation in fractional[reference] - rotated[reference[0]]:
+                difference = rotated[:, np.newaxis, :] + translation - fractional[np.newaxis, :, :]
+                difference -= np.round(difference)
+                matches = np.all(np.abs(difference) < tolerance, axis=2) & same_element
+                if np.all(np.any(matches, axis=1)):
+                    symmetric.append(operation)
+                    break
+        return np.array(symmetric).reshape(-1, 3, 3)
+
+    def irreducible_kpoints(self, symmetry=True, time_reversal=True, tolerance=1e-5):
+        '''
+            Reduce the mesh to the irreducible wedge of the Brillouin zone.
+            Return the irreducible k points (units of the reciprocal lattice vectors) and their
+            weights (normalized to 1).
+        '''
+        mesh = self.mesh
+        origin = self.__mesh_origin()
+        kpoints = self.kpoints()
+        indices = np.stack(np.meshgrid(*[np.arange(n) for n in mesh], indexing='ij'), axis=-1).reshape(-1, 3)
+        strides = np.array([mesh[1] * mesh[2], mesh[2], 1])
+        representative = np.matmul(indices, strides)
+
+        operations = self.symmetry_operations(tolerance) if symmetry else np.eye(3, dtype=np.int64)[np.newaxis]
+        if time_reversal:
+            operations = np.unique(np.concatenate([operations, -operations]), axis=0)
+        for operation in operations:
+            # reciprocal coordinates transform as k' = k R^-1 (the group also contains R^-1).
+            # On mesh indices: i' = (i + o) A - o, with A_ab = R_ab N_b / N_a
+            matrix = operation * mesh[np.newaxis, :] / mesh[:, np.newaxis]
+            constant = np.matmul(origin, matrix) - origin
+            if (np.any(np.abs(matrix - np.round(matrix)) > tolerance)
+                    or np.any(np.abs(constant - np.round(constant)) > tolerance)):
+                # operation does not map the mesh onto itself
+                continue
+            images = (np.matmul(indices, np.round(matrix).astype(np.int64))
+                      + np.round(constant).astype(np.int64)) % mesh
+            np.minimum(representative, np.matmul(images, strides), out=representative)
+
+        irreducible, weights = np.unique(representative, return_counts=True)
+        return kpoints[irreducible], weights / kpoints.shape[0]
 
 
 class Planewave(KGrid):
-    '''
+    r'''
         Planewave class to span pediodic wave functions.
         A planewave object is defined by a list of reciprocal lattice vectors [G_1, G_2, ...].
 
             \psi_{nk}(r) = \sum_{G}c_{n}(k+G)exp(i(k+G).r)
 
+        For each k point, the basis contains all G with |k+G|^2/2 < energy_cutoff (atomic units).
+        The basis of all k points is stored as one array of Miller indices, with offsets per k point,
+        and the matching flat indices in the FFT grid, so coefficients can be scattered to (and
+        gathered from) the grid with fancy indexing.
+
+        Example:
+            basis = Planewave(material, energy_cutoff=20, matrix=np.diag([4, 4, 4]))
+            grid = basis.scatter(coefficients, 0)   # coefficients of shape (nbands, nG)
     '''
-    def __init__(self, energy_cutoff = 20, energy_unit = "Ha"):
+    def __init__(self, material, energy_cutoff=20, energy_unit="Ha", matrix=np.eye(3),
+                 shift=np.array([0, 0, 0]), gamma_centered=False, symmetry=False, fft_grid=None):
         '''
             Planewave object constructor.
+            With symmetry=False, the k points are reduced only by time reversal, so weighted sums
+            over k points (e.g. the density) need no symmetrization. With symmetry=True, the k points
+            are reduced by the point group, which is enough for eigenvalues but not for such sums.
         '''
+        KGrid.__init__(self, material, matrix, shift, gamma_centered)
+        if energy_unit not in energy_units:
+            raise Exception("Unknown energy unit {}. Use one of {}.".format(energy_unit, list(energy_units)))
         self.__energy_cutoff = energy_cutoff
         self.__energy_unit = energy_unit
+        self.__symmetry = symmetry
+        self.__kpoints, self.__weights = self.irreducible_kpoints(symmetry=symmetry)
+        self.__build_basis(fft_grid)
 
+    @property
+    def energy_cutoff(self):
+        return self.__energy_cutoff
 
-class Operator(Planewave):
+    @property
+    def energy_unit(self):
+        return self.__energy_unit
+
+    @property
+    def symmetry(self):
+        return self.__symmetry
+
+    @property
+    def cutoff(self):
+        '''
+            Energy cutoff in Hartree.
+        '''
+        return self.__energy_cutoff * energy_units[self.__energy_unit]
+
+    @property
+    def basis_kpoints(self):
+        return self.__kpoints
+
+    @property
+    def kpoint_weights(self):
+        return self.__weights
+
+    @property
+    def fft_grid(self):
+        return self.__fft_grid
+
+    @property
+    def miller_indices(self):
+        return self.__miller
+
+    @property
+    def fft_indices(self):
+        return self.__fft_indices
+
+    @property
+    def offsets(self):
+        return self.__offsets
+
+    @property
+    def volume(self):
+        '''
+            Unit cell volume in bohr^3.
+        '''
+        return abs(np.linalg.det(self.bravais_lattice)) / bohr_radius**3
+
+    def reciprocal_lattice_au(self):
+        '''
+            Reciprocal lattice vectors (rows) in bohr^-1.
+        '''
+        return self.reciprocal_lattice() * bohr_radius
+
+    def __build_basis(self, fft_grid):
+        '''
+            Enumerate the G vectors inside the cutoff sphere of every k point and map them to the FFT grid.
+        '''
+        reciprocal = self.reciprocal_lattice_au()
+        metric = np.matmul(reciprocal, reciprocal.T)
+        gmax = np.sqrt(2.0 * self.cutoff)
+        # |G.a_i| = 2 pi |m_i| bounds the Miller indices inside a sphere of radius gmax (plus |k| <= 1)
+        bounds = np.floor(gmax * np.linalg.norm(self.bravais_lattice, axis=1) / bohr_radius / (2 * np.pi)).astype(np.int64) + 1
+        box = np.stack(np.meshgrid(*[np.arange(-n, n + 1) for n in bounds], indexing='ij'), axis=-1).reshape(-1, 3)
+
+        miller, counts = [], [0]
+        for kpoint in self.__kpoints:
+            q = box + kpoint
+            inside = np.einsum('ij,jk,ik->i', q, metric, q) < gmax**2
+            miller.append(box[inside])
+            counts.append(miller[-1].shape[0])
+        self.__miller = np.concatenate(miller).astype(np.int32)
+        self.__offsets = np.cumsum(counts)
+
+        if fft_grid is None:
+            # the grid holds the density without aliasing, with Fourier components up to G - G'
+            extent = np.abs(self.__miller).max(axis=0) if self.__miller.shape[0] else np.zeros(3, dtype=np.int64)
+            fft_grid = [fft_size(4 * n + 1) for n in extent]
+        self.__fft_grid = np.array(fft_grid, dtype=np.int64)
+        wrapped = self.__miller % self.__fft_grid
+        dtype = np.int32 if self.__fft_grid.prod() < 2**31 else np.int64
+        self.__fft_indices = np.ravel_multi_index(wrapped.T, self.__fft_grid).astype(dtype)
+
+    def number_of_planewaves(self, k=None):
+        '''
+            Number of planewaves for k point index k (or for all k points).
+        '''
+        counts = np.diff(self.__offsets)
+        return counts if k is None else counts[k]
+
+    def basis(self, k):
+        '''
+            Miller indices of the G vectors for k point index k.
+        '''
+        return self.__miller[self.__offsets[k]:self.__offsets[k + 1]]
+
+    def grid_indices(self, k):
+        '''
+            Flat FFT grid indices of the G vectors for k point index k.
+        '''
+        return self.__fft_indices[self.__offsets[k]:self.__offsets[k + 1]]
+
+    def kplusg(self, k):
+        '''
+            Cartesian k+G vectors (bohr^-1) for k point index k.
+        '''
+        return np.matmul(self.basis(k) + self.__kpoints[k], self.reciprocal_lattice_au())
+
+    def scatter(self, coefficients, k):
+        '''
+            Place coefficients of shape (..., nG) on the FFT grid, returning shape (..., n1, n2, n3).
+        '''
+        coefficients = np.asarray(coefficients)
+        grid = np.zeros(coefficients.shape[:-1] + (int(self.__fft_grid.prod()),), dtype=np.complex128)
+        grid[..., self.grid_indices(k)] = coefficients
+        return grid.reshape(coefficients.shape[:-1] + tuple(self.__fft_grid))
+
+    def gather(self, grid, k):
+        '''
+            Extract the coefficients of the basis of k point index k from an FFT grid of shape (..., n1, n2, n3).
+        '''
+        grid = np.asarray(grid)
+        return grid.reshape(grid.shape[:-3] + (-1,))[..., self.grid_indices(k)]
+
+
+def lowest_eigenpairs(kinetic, indices, fft_grid, potential, guess, tolerance=1e-6, maxiter=200,
+                      workers=-1, projector=None):
+    '''
+        Lowest eigenpairs of H = T + V for one k point, with T = diag(kinetic) and V a local potential on
+        the FFT grid (indices: flat FFT grid index of each planewave). H is applied matrix-free inside
+        scipy's LOBPCG, with the kinetic diagonal as preconditioner.
+        An optional projector xi of shape (nxi, nG) adds the low-rank (ACE) exchange term -|xi><xi|.
+        guess has shape (nbands, nG); returns eigenvalues (nbands,) and eigenvectors (nbands, nG).
     '''
-        Operator class in planewave basis
+    shape = tuple(fft_grid)
+    size = int(np.prod(shape))
+
+    def apply(block):
+        block = block.reshape(block.shape[0], -1).T
+        grid = np.zeros((block.shape[0], size), dtype=np.complex128)
+        grid[:, indices] = block
+        values = fft.ifftn(grid.reshape((-1,) + shape), axes=(-3, -2, -1), norm='forward', overwrite_x=True,
+                           workers=workers)
+        values *= potential
+        grid = fft.fftn(values, axes=(-3, -2, -1), norm='forward', overwrite_x=True, workers=workers)
+        hpsi = grid.reshape(block.shape[0], size)[:, indices] + block * kinetic
+        if projector is not None:
+            hpsi -= np.matmul(np.matmul(block, projector.conj().T), projector)
+        return hpsi.T
+
+    n = kinetic.shape[0]
+    hamiltonian = LinearOperator((n, n), matvec=apply, matmat=apply, dtype=np.complex128)
+    # damp the high kinetic energy components, which dominate the residuals
+    scale = 1.0 / (1.0 + kinetic / max(np.mean(kinetic), 1e-12))
+    preconditioner = LinearOperator((n, n), matvec=lambda x: x.reshape(n, -1) * scale[:, np.newaxis],
+                                    matmat=lambda x: x * scale[:, np.newaxis], dtype=np.complex128)
+    eigenvalues, eigenvectors = lobpcg(hamiltonian, np.asarray(guess, dtype=np.complex128).T, M=preconditioner,
+                                       tol=tolerance, maxiter=maxiter, largest=False)
+    order = np.argsort(eigenvalues)
+    return eigenvalues[order], eigenvectors[:, order].T
+
+
+class Operator(Planewave):
+    r'''
+        Operator class in planewave basis.
+        Operators are applied matrix-free to batches of coefficients of shape (nbands, nG), with the
+        FFTs of all bands done in one multithreaded call (workers as in scipy.fft, -1 uses all cores).
+
+        Real-space functions are the periodic parts u_nk(r) = \sum_G c_n(k+G) exp(iG.r)/sqrt(V),
+        sampled on the FFT grid.
+
+        Example:
+            operator = Operator(material, energy_cutoff=15, matrix=np.diag([4, 4, 4]))
+            potential = operator.hartree_potential(density)
+            hpsi = operator.kinetic_operator(coefficients, k) + operator.local_operator(coefficients, k, potential)
     '''
-    def __init__(self):
-        pass # TODO
+    def __init__(self, material, energy_cutoff=20, energy_unit="Ha", matrix=np.eye(3),
+                 shift=np.array([0, 0, 0]), gamma_centered=False, symmetry=False, fft_grid=None, workers=-1):
+        '''
+            Operator object constructor.
+        '''
+        Planewave.__init__(self, material, energy_cutoff, energy_unit, matrix, shift, gamma_centered,
+                           symmetry, fft_grid)
+        self.__workers = workers
+        self.__eigenvectors = {}
+        self.__projectors = {}
+        # Miller indices and |G|^2 on the full FFT grid (bohr^-2)
+        frequencies = [np.fft.fftfreq(n, 1.0 / n) for n in self.fft_grid]
+        self.__miller_grid = np.stack(np.meshgrid(*frequencies, indexing='ij'), axis=-1)
+        self.__g_squared = np.sum(np.matmul(self.__miller_grid, self.reciprocal_lattice_au())**2, axis=-1)
+
+    @property
+    def workers(self):
+        return self.__workers
+
+    @property
+    def g_squared(self):
+        return self.__g_squared
+
+    def to_real_space(self, coefficients, k):
+        '''
+            Transform coefficients (..., nG) of k point index k to u(r) on the FFT grid (..., n1, n2, n3).
+        '''
+        grid = self.scatter(coefficients, k)
+        return fft.ifftn(grid, axes=(-3, -2, -1), norm='forward', overwrite_x=True,
+                         workers=self.__workers) / np.sqrt(self.volume)
+
+    def to_reciprocal_space(self, values, k):
+        '''
+            Transform u(r) on the FFT grid (..., n1, n2, n3) to coefficients (..., nG) of k point index k.
+        '''
+        grid = fft.fftn(values, axes=(-3, -2, -1), norm='forward', workers=self.__workers)
+        return self.gather(grid, k) * np.sqrt(self.volume)
+
+    def kinetic_energies(self, k):
+        '''
+            Diagonal of the kinetic operator, |k+G|^2/2 (Hartree), for k point index k.
+        '''
+        return 0.5 * np.sum(self.kplusg(k)**2, axis=1)
+
+    def kinetic_operator(self, coefficients, k):
+        '''
+            Apply the kinetic operator to coefficients (..., nG) of k point index k.
+        '''
+        return coefficients * self.kinetic_energies(k)
+
+    def density(self, coefficients, occupations):
+        '''
+            Electron density (bohr^-3) on the FFT grid, from a list (one entry per k point) of
+            coefficients (nbands, nG) and occupations of shape (nk, nbands).
+            The k point weights are included, so the density integrates to the number of electrons.
+        '''
+        self.__require_full_mesh('density')
+        density = np.zeros(tuple(self.fft_grid))
+        for k, (weight, c) in enumerate(zip(self.kpoint_weights, coefficients)):
+            values = self.to_real_space(c, k)
+            density += weight * np.einsum('n,nijk->ijk', np.asarray(occupations[k], dtype=np.float64),
+                                          values.real**2 + values.imag**2)
+        return density
 
-    def kinetic_operator(self):
-        pass # TODO
+    def hartree_potential(self, density):
+        '''
+            Hartree potential (Hartree) on the FFT grid, solving the Poisson equation in reciprocal
+            space: V(G) = 4 pi rho(G)/G^2, with V(G=0) = 0 (neutralizing background).
+        '''
+        rho = fft.fftn(density, norm='forward', workers=self.__workers)
+        potential = np.zeros_like(rho)
+        nonzero = self.__g_squared > 0
+        potential[nonzero] = 4 * np.pi * rho[nonzero] / self.__g_squared[nonzero]
+        return fft.ifftn(potential, norm='forward', overwrite_x=True, workers=self.__workers).real
 
-    def hartree_operator(self):
-        pass # TODO
+    def local_operator(self, coefficients, k, potential):
+        '''
+            Apply a local potential (on the FFT grid) to coefficients (..., nG) of k point index k.
+        '''
+        return self.to_reciprocal_space(self.to_real_space(coefficients, k) * potential, k)
 
-    def exchange_operator(self):
-        pass # TODO
+    def hartree_operator(self, coefficients, k, density):
+        '''
+            Apply the Hartree potential of density to coefficients (..., nG) of k point index k.
+        '''
+        return self.local_operator(coefficients, k, self.hartree_potential(density))
+
+    def hartree_energy(self, density):
+        '''
+            Hartree energy (Hartree) of a density on the FFT grid.
+        '''
+        return 0.5 * np.sum(density * self.hartree_potential(density)) * self.volume / self.fft_grid.prod()
+
+    def hamiltonian(self, k, potential, exchange_fraction=0.0):
+        '''
+            Kohn-Sham Hamiltonian T + V for k point index k, with V a local potential on the FFT grid,
+            as a scipy LinearOperator acting on coefficient vectors (or blocks of shape (nG, nbands)).
+            With exchange_fraction > 0, the ACE exchange operator (see build_ace()) is added.
+        '''
+        n = self.number_of_planewaves(k)
+
+        def apply(block):
+            block = block.reshape(n, -1).T
+            hpsi = self.kinetic_operator(block, k) + self.local_operator(block, k, potential)
+            if exchange_fraction:
+                hpsi += exchange_fraction * self.ace_operator(block, k)
+            return hpsi.T
+
+        return LinearOperator((n, n), matvec=apply, matmat=apply, dtype=np.complex128)
+
+    def initial_guess(self, k, nbands, seed=0):
+        '''
+            Starting coefficients (nbands, nG): the planewaves of lowest kinetic energy, with a small
+            random admixture so the block is not degenerate.
+        '''
+        n = self.number_of_planewaves(k)
+        if nbands > n:
+            raise Exception("Number of bands ({}) exceeds the number of planewaves ({}).".format(nbands, n))
+        guess = 0.01 * np.random.default_rng(seed).standard_normal((nbands, n)).astype(np.complex128)
+        guess[np.arange(nbands), np.argsort(self.kinetic_energies(k), kind='stable')[:nbands]] += 1.0
+        return guess
+
+    def solve(self, potential, nbands, tolerance=1e-6, maxiter=200, processes=None, exchange_fraction=0.0):
+        '''
+            Lowest nbands eigenpairs of T + V at every k point, for a local potential V on the FFT grid.
+            Returns eigenvalues (nk, nbands) in Hartree and a list of coefficients (nbands, nG), one per k point.
+
+            Eigenvectors of a previous call with the same number of bands are used as starting point
+            (warm start between SCF iterations). With processes > 1, k points are solved in parallel
+            in a process pool (with single-threaded FFTs in each process).
+            With exchange_fraction > 0, the ACE exchange operator of the last build_ace() call is included.
+        '''
+        if exchange_fraction and not self.__projectors:
+            raise Exception("Call build_ace() before solving with exact exchange.")
+        arguments, projectors = [], []
+        for k in range(len(self.basis_kpoints)):
+            guess = self.__eigenvectors.get(k)
+            if guess is None or guess.shape[0] != nbands:
+                guess = self.initial_guess(k, nbands)
+            projectors.append(np.sqrt(exchange_fraction) * self.__projectors[k] if exchange_fraction else None)
+            arguments.append((self.kinetic_energies(k), self.grid_indices(k), self.fft_grid, potential, guess,
+                              tolerance, maxiter))
+
+        if processes is None or processes == 1:
+            results = [lowest_eigenpairs(*args, workers=self.__workers, projector=projector)
+                       for args, projector in zip(arguments, projectors)]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(lowest_eigenpairs, *args, workers=1, projector=projector)
+                           for args, projector in zip(arguments, projectors)]
+                results = [future.result() for future in futures]
+
+        eigenvalues = np.array([result[0] for result in results])
+        eigenvectors = [result[1] for result in results]
+        self.__eigenvectors = dict(enumerate(eigenvectors))
+        return eigenvalues, eigenvectors
+
+    def coulomb_kernel(self, q):
+        '''
+            Coulomb kernel 4 pi/|G+q|^2 on the FFT grid, for q in units of the reciprocal lattice vectors.
+            The divergent G+q = 0 term is set to zero.
+        '''
+        q_squared = np.sum(np.matmul(self.__miller_grid + q, self.reciprocal_lattice_au())**2, axis=-1)
+        kernel = np.zeros_like(q_squared)
+        nonzero = q_squared > 1e-12
+        kernel[nonzero] = 4 * np.pi / q_squared[nonzero]
+        return kernel
+
+    def __require_full_mesh(self, name):
+        '''
+            Sums over the Brillouin zone unfold basis k points by time reversal only: the orbitals of
+            the other k points of a star are not available with a point group reduced basis.
+        '''
+        if self.symmetry:
+            raise Exception("{}() needs k points reduced by time reversal only. "
+                            "Use symmetry=False.".format(name))
+
+    def __occupied_states(self, orbitals, occupations):
+        '''
+            Occupied states over the full k mesh as (q, weight, occupations, u(r)) entries. Basis k points
+            stand for q and -q (time reversal), with u_{-q}(r) = u_q(r)^*.
+        '''
+        self.__require_full_mesh('exchange_operator')
+        states = []
+        for q, (weight, c) in enumerate(zip(self.kpoint_weights, orbitals)):
+            kpoint = self.basis_kpoints[q]
+            occupied = np.asarray(occupations[q], dtype=np.float64) > 0
+            values = self.to_real_space(np.asarray(c)[occupied], q)
+            f = np.asarray(occupations[q], dtype=np.float64)[occupied]
+            if np.allclose(2 * kpoint, np.round(2 * kpoint)):
+                states.append((kpoint, weight, f, values))
+            else:
+                states.append((kpoint, 0.5 * weight, f, values))
+                states.append((-kpoint, 0.5 * weight, f, values.conj()))
+        return states
+
+    def exchange_operator(self, coefficients, k, orbitals, occupations, memory=2**28, states=None):
+        r'''
+            Apply the exact (Fock) exchange operator to coefficients (nbands, nG) of k point index k:
+
+                V_x \psi_{nk}(r) = -\sum_{mq} w_q f_{mq}/2 \phi_{mq}(r) \int \phi^*_{mq}(r')\psi_{nk}(r')/|r - r'| dr'
+
+            orbitals is a list (one per basis k point) of occupied coefficients (nocc, nG), with
+            occupations (nk, nocc) between 0 and 2 (spin-degenerate orbitals, exchange only couples
+            equal spins). Pair densities of a chunk of occupied orbitals with all bands are transformed
+            together; the chunk is sized so that the pair densities use about memory bytes.
+        '''
+        if states is None:
+            states = self.__occupied_states(orbitals, occupations)
+        coefficients = np.atleast_2d(coefficients)
+        values = self.to_real_space(coefficients, k)
+        kpoint = self.basis_kpoints[k]
+        grid_size = int(self.fft_grid.prod())
+        chunk = max(1, int(memory // (16 * grid_size * coefficients.shape[0])))
+
+        result = np.zeros_like(values)
+        for q, weight, f, occupied in states:
+            kernel = self.coulomb_kernel(kpoint - q)
+            for start in range(0, occupied.shape[0], chunk):
+                block = occupied[start:start + chunk]
+                pairs = block.conj()[:, np.newaxis] * values[np.newaxis]
+                pairs = fft.fftn(pairs, axes=(-3, -2, -1), norm='forward', overwrite_x=True, workers=self.__workers)
+                pairs *= kernel
+                pairs = fft.ifftn(pairs, axes=(-3, -2, -1), norm='forward', overwrite_x=True, workers=self.__workers)
+                scale = -0.5 * weight * f[start:start + chunk]
+                result += np.einsum('m,mijk,mnijk->nijk', scale, block, pairs)
+        return self.to_reciprocal_space(result, k)
+
+    def build_ace(self, orbitals, occupations, memory=2**28):
+        '''
+            Build the adaptively compressed exchange (ACE) operator [J. Chem. Theory Comput. 12, 2242 (2016)]
+            from the orbitals (list of (nbands, nG) coefficients per k point) and occupations (nk, nbands).
+            The exact exchange W = V_x psi is computed once per k point; afterwards V_x is applied as
+            the low-rank projector -|xi><xi|, with xi = W L^-H and M = psi^H W = -L L^H.
+        '''
+        self.__require_full_mesh('build_ace')
+        states = self.__occupied_states(orbitals, occupations)
+        self.__projectors = {}
+        for k, psi in enumerate(orbitals):
+            psi = np.atleast_2d(psi)
+            w = self.exchange_operator(psi, k, orbitals, occupations, memory, states)
+            m = np.matmul(psi.conj(), w.T)
+            cholesky = np.linalg.cholesky(-0.5 * (m + m.conj().T))
+            self.__projectors[k] = np.linalg.solve(cholesky, w.conj()).conj()
+        return self.__projectors
+
+    def ace_operator(self, coefficients, k):
+        '''
+            Apply the ACE exchange operator (see build_ace()) to coefficients (..., nG) of k point index k.
+        '''
+        if k not in self.__projectors:
+            raise Exception("ACE projectors not built. Call build_ace() first.")
+        projector = self.__projectors[k]
+        return -np.matmul(np.matmul(coefficients, projector.conj().T), projector)
@@ -1,3 +1,494 @@
+import os
 import numpy as np
-#import ocelot as ocl
+import pandas as pd
+import ocelot as ocl
 
+XYZ_DIR = os.path.join(os.path.dirname(__file__), '..', 'ocelot', 'xyz')
+
+
+def read_molecule(name):
+    molecule = ocl.Molecule()
+    molecule.from_xyz(os.path.join(XYZ_DIR, name))
+    return molecule
+
+
+def test_atoms_are_views_of_arrays():
+    molecule = read_molecule('benzene.xyz')
+    atom = molecule.atoms[0]
+    atom.coordinates = atom.coordinates + np.array([1.0, 0.0, 0.0])
+    assert np.allclose(molecule.coordinates[0], [2.94652, 4.91040, 0.0])
+    assert molecule.arrays.version == 1
+    assert len(molecule.atoms) == 12
+    try:
+        molecule.atoms.append(atom)
+        assert False
+    except AttributeError:
+        pass
+    assert molecule.to_dataframe()['element'].tolist() == [1]*6 + [6]*6
+
+
+def test_bonds_match_pairwise_search():
+    molecule = read_molecule('C96H24.xyz')
+    bonds = molecule.bonds()
+    df = molecule.to_dataframe()
+    xyz = df[['x', 'y', 'z']].values
+    radii = np.asarray(ocl.covalent_radius)[df['element'].values]
+    distances = np.linalg.norm(xyz[:, None] - xyz[None, :], axis=2)
+    cutoff = 1.2*(radii[:, None] + radii[None, :])
+    expected = np.argwhere(np.triu((distances < cutoff) & (distances > 0.0)))
+    assert sorted(map(tuple, expected.tolist())) == sorted(zip(bonds['index 1'], bonds['index 2']))
+    assert bonds['distance'].is_monotonic_increasing
+
+
+def test_periodic_neighbor_list_beyond_half_cell():
+    atom = ocl.Atom(element=29, coordinates=[0.25, 0.5, 0.75])
+    cubic = ocl.Material(atoms=[atom], lattice_constant=2.0)
+    assert len(cubic.neighbor_list(2.01)) == 6
+    neighbors = cubic.neighbor_list(2.0*np.sqrt(2) + 0.01)
+    assert len(neighbors) == 18
+    assert np.allclose(neighbors.vectors, np.matmul(neighbors.images, cubic.bravais_lattice))
+    assert neighbors.offsets.tolist() == [0, 18]
+
+
+def test_ethane_angles_and_torsions():
+    ethane = read_molecule('ethane.xyz')
+    angles = ethane.angles()
+    assert len(angles) == 12
+    assert np.allclose(angles['angle'], 109.5, atol=1.0)
+    dihedrals = ethane.dihedral_angles()
+    assert len(dihedrals) == 9
+    assert np.allclose(np.sort(np.abs(dihedrals['angle']))[::3], [60.0, 60.0, 180.0], atol=0.01)
+    assert len(ethane.improper_angles()) == 8
+
+
+def test_sparse_nearest_neighbors():
+    ethane = read_molecule('ethane.xyz')
+    assert ethane.nearest_neighbors_list()[6] == [0, 1, 2, 7]
+    assert len(ethane.nearest_neighbors_list()) == len(ethane)
+    assert ocl.Molecule().nearest_neighbors_list() == []
+    matrix = ethane.nearest_neighbors_matrix()
+    assert matrix.nnz == 7
+    assert np.allclose(ethane.nearest_neighbors_matrix(format='dense').values, matrix.toarray())
+
+
+def test_cached_data_invalidated_by_mutation():
+    molecule = read_molecule('ethane.xyz')
+    assert molecule.bonds() is not None
+    assert molecule.topology() is molecule.topology()
+    molecule.coordinates = molecule.coordinates * 2.0
+    assert len(molecule.bonds()) == 0
+    molecule.join(read_molecule('ethane.xyz').move([50.0, 0.0, 0.0]))
+    assert len(molecule.bonds()) == 7
+    # in-place writes must go through setters or update(), which bump the version
+    for write in (lambda: molecule.coordinates.__imul__(3.0), lambda: molecule.atoms[0].coordinates.fill(0.0)):
+        try:
+            write()
+            assert False
+        except ValueError:
+            pass
+    molecule.arrays.update('coordinates', molecule.coordinates * 3.0)
+    assert len(molecule.bonds()) == 0
+    # returned dataframes are copies of the cached ones
+    ethane = read_molecule('ethane.xyz')
+    frame = ethane.bonds()
+    distances = frame['distance'].to_numpy().copy()
+    frame.loc[:, 'distance'] = 0.0
+    assert np.allclose(ethane.bonds()['distance'], distances)
+
+    calls = []
+
+    class Failing(ocl.Molecule):
+        @ocl.cached
+        def failing(self, value=1):
+            calls.append(value)
+            raise TypeError("inside the method")
+
+    try:
+        Failing().failing()
+    except TypeError:
+        pass
+    assert calls == [1]
+
+
+def test_from_xyz_ignores_extra_columns(tmp_path):
+    path = tmp_path / 'water.xyz'
+    path.write_text("3\nwater with forces\nO 0.0 0.0 0.1 0.5 0.5 0.5\nH 0.0 0.75 -0.5 0.1 0.1 0.1\n"
+                    "H 0.0 -0.75 -0.5 0.1 0.1 0.1\n")
+    water = ocl.Molecule()
+    water.from_xyz(str(path))
+    assert water.elements.tolist() == [8, 1, 1]
+    assert np.allclose(water.coordinates[1], [0.0, 0.75, -0.5])
+
+
+def test_trajectory_random_access(tmp_path):
+    path = tmp_path / 'md.xyz'
+    frames = ["{}\nframe {}\n".format(n, n) + "".join("H {} 0.0 0.0\n".format(k) for k in range(n))
+              for n in (1, 3, 2)]
+    path.write_text("".join(frames))
+    trajectory = ocl.Trajectory(str(path))
+    assert len(trajectory) == 3
+    assert len(trajectory[1]) == 3
+    assert np.allclose(trajectory[-1].coordinates[:, 0], [0.0, 1.0])
+    assert [len(molecule) for molecule in trajectory] == [1, 3, 2]
+    assert os.path.exists(trajectory.index_file)
+    assert ocl.Trajectory(str(path)).offsets.tolist() == trajectory.offsets.tolist()
+    custom = ocl.Trajectory(str(path), index_file=str(tmp_path / 'md.idx'))
+    assert len(custom) == 3
+    assert os.path.exists(custom.index_file) and not os.path.exists(custom.index_file + '.npz')
+
+
+def test_write_xyz_round_trip_and_append(tmp_path):
+    benzene = read_molecule('benzene.xyz')
+    path = str(tmp_path / 'frames.xyz')
+    benzene.write_xyz(path)
+    benzene.move([1.0, 0.0, 0.0]).write_xyz(path, comment='shifted', mode='a')
+    trajectory = ocl.Trajectory(path)
+    assert len(trajectory) == 2
+    assert np.allclose(trajectory[1].coordinates, trajectory[0].coordinates + [1.0, 0.0, 0.0])
+    assert np.allclose(np.sort(trajectory[0].coordinates, axis=0), np.sort(benzene.coordinates, axis=0))
+    empty = str(tmp_path / 'empty.xyz')
+    ocl.Molecule().write_xyz(empty)
+    molecule = ocl.Molecule()
+    molecule.from_xyz(empty)
+    assert len(molecule) == 0
+    ocl.Material().write_poscar(str(tmp_path / 'POSCAR'))
+
+
+def test_binary_archive_round_trip(tmp_path):
+    benzene = read_molecule('benzene.xyz')
+    benzene.charge = -1.0
+    path = str(tmp_path / 'benzene.ocelot')
+    benzene.save(path)
+    loaded = ocl.Molecule.load(path)
+    assert loaded.charge == -1.0
+    assert np.array_equal(loaded.coordinates, benzene.coordinates)
+    graphene = ocl.Material(atoms=[ocl.Atom(element=6)], lattice_constant=2.46)
+    archive = str(tmp_path / 'many.ocelot')
+    ocl.save_structures(archive, [benzene, graphene], names=['benzene', 'graphene'])
+    assert ocl.Archive(archive).names == ['benzene', 'graphene']
+    assert np.allclose(ocl.Chemical.load(archive, index='graphene').bravais_lattice, 2.46*np.eye(3))
+    try:
+        ocl.save_structures(archive, [benzene, benzene, graphene], names=['benzene'])
+        assert False
+    except Exception as error:
+        assert 'names' in str(error)
+    # numpy scalars as constructor parameters
+    ion = ocl.Molecule([ocl.Atom(11)], charge=np.int64(1), spin=np.float32(0.5), fixed=np.bool_(True))
+    ion.save(path)
+    loaded = ocl.Molecule.load(path)
+    assert loaded.charge == 1 and loaded.spin == 0.5 and loaded.fixed is True
+
+
+def test_inplace_and_batched_rigid_transforms():
+    methane = read_molecule('methane.xyz')
+    original = methane.coordinates.copy()
+    rotated = methane.rotate('z', 90)
+    assert np.allclose(methane.coordinates, original)
+    assert np.allclose(rotated.coordinates[:, 0], -original[:, 1])
+    assert methane.move([1.0, 0.0, 0.0], inplace=True) is methane
+    assert np.allclose(methane.coordinates, original + [1.0, 0.0, 0.0])
+    batch = methane.batch_transform(np.stack([np.eye(3), -np.eye(3)]), [[0.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    assert batch.shape == (2, len(methane), 3)
+    assert np.allclose(batch[1], -methane.coordinates + [0.0, 0.0, 1.0])
+
+
+def test_concatenate_keeps_fragment_ids():
+    methane = read_molecule('methane.xyz')
+    shifts = [[0.0, 0.0, 0.0], [10.0, 0.0, 0.0], [0.0, 10.0, 0.0]]
+    box = ocl.Molecule.concatenate([methane]*3, translations=shifts)
+    assert len(box) == 3*len(methane)
+    assert np.bincount(box.fragments).tolist() == [len(methane)]*3
+    assert np.allclose(box.fragment(2).coordinates, methane.coordinates + shifts[2])
+    assert len(ocl.Molecule()) == 0
+
+
+def graphene():
+    carbon1 = ocl.Atom(element=6, coordinates=[0.0, 0.0, 0.5])
+    carbon2 = ocl.Atom(element=6, coordinates=[1/3, 1/3, 0.5])
+    return ocl.Material(atoms=[carbon1, carbon2], lattice_constant=2.46,
+                        bravais_vector=[[np.sqrt(3)/2, -1/2, 0.0], [np.sqrt(3)/2, 1/2, 0.0], [0.0, 0.0, 20.0/2.46]])
+
+
+def test_make_supercell_non_diagonal():
+    supercell = graphene().make_supercell([[1, 1, 0], [-1, 2, 0], [0, 0, 1]])
+    assert len(supercell) == 6
+    assert np.all((supercell.coordinates >= 0.0) & (supercell.coordinates < 1.0))
+    assert np.all(supercell.neighbor_list(1.5).coordination() == 3)
+
+
+def test_poscar_round_trip(tmp_path):
+    material = graphene()
+    material.selective_dynamics = [[True, True, False], [False, False, False]]
+    path = str(tmp_path / 'POSCAR')
+    material.write_poscar(path)
+    loaded = ocl.Material()
+    loaded.from_poscar(path)
+    assert loaded.elements.tolist() == [6, 6]
+    assert np.allclose(loaded.bravais_lattice, material.bravais_lattice)
+    assert np.allclose(loaded.coordinates, material.coordinates)
+    assert loaded.selective_dynamics.tolist() == material.selective_dynamics.tolist()
+    archive = str(tmp_path / 'graphene.ocelot')
+    material.save(archive)
+    assert ocl.Material.load(archive).selective_dynamics.tolist() == material.selective_dynamics.tolist()
+    assert ocl.load_structures(archive)[0].selective_dynamics.tolist() == material.selective_dynamics.tolist()
+    supercell = material.make_supercell([[2, 0, 0], [0, 1, 0], [0, 0, 1]])
+    assert supercell.selective_dynamics.tolist() == material.selective_dynamics.tolist() * 2
+
+    # VASP 6 scale factor per Cartesian direction, with Cartesian coordinates
+    with open(path, 'w') as stream:
+        stream.write("cubic\n  2.0 1.0 1.0\n  1 0 0\n  0 1 0\n  0 0 1\n  C\n  1\nCartesian\n  1.0 0.5 0.5\n")
+    loaded.from_poscar(path)
+    assert np.allclose(loaded.bravais_lattice, np.diag([2.0, 1.0, 1.0]))
+    assert np.allclose(loaded.crystallographic_coordinates() % 1.0, [[0.0, 0.5, 0.5]])
+
+
+def test_xdatcar_frames(tmp_path):
+    header = "graphene\n 2.46\n 0.866 -0.5 0.0\n 0.866 0.5 0.0\n 0.0 0.0 8.13\n C\n 2\n"
+    frames = "".join("Direct configuration= {}\n 0.0 0.0 0.5\n 0.{} 0.333 0.5\n".format(k + 1, k) for k in range(4))
+    path = tmp_path / 'XDATCAR'
+    path.write_text(header + frames)
+    trajectory = ocl.XdatcarTrajectory(str(path))
+    assert len(trajectory) == 4
+    assert np.isclose(trajectory[2].coordinates[1, 0], 0.2)
+    assert np.isclose(trajectory[-1].lattice_constant, 2.46)
+
+
+def silicon():
+    atoms = [ocl.Atom(14, coordinates=[0.0, 0.0, 0.0]), ocl.Atom(14, coordinates=[0.25, 0.25, 0.25])]
+    fcc = [[0.0, 0.5, 0.5], [0.5, 0.0, 0.5], [0.5, 0.5, 0.0]]
+    return ocl.Material(atoms, lattice_constant=5.43, bravais_vector=fcc)
+
+
+def test_irreducible_kpoints():
+    from ocelot.wavefunction import KGrid
+    kgrid = KGrid(silicon(), np.diag([4, 4, 4]))
+    assert len(kgrid.symmetry_operations()) == 48
+    kpoints, weights = kgrid.irreducible_kpoints()
+    assert len(kpoints) == 10
+    assert np.isclose(weights.sum(), 1.0)
+    kpoints, weights = KGrid(graphene(), np.diag([12, 12, 1]), gamma_centered=True).irreducible_kpoints()
+    assert len(kpoints) == 19
+
+
+def test_planewave_basis():
+    from ocelot.wavefunction import Planewave, fft_size
+    assert [fft_size(n) for n in (7, 11, 13, 17, 64)] == [8, 12, 15, 18, 64]
+    basis = Planewave(silicon(), energy_cutoff=10, matrix=np.diag([2, 2, 2]))
+    for k in range(len(basis.basis_kpoints)):
+        assert np.all(0.5 * np.sum(basis.kplusg(k)**2, axis=1) < basis.cutoff)
+    # number of planewaves ~ volume of the cutoff sphere
+    assert np.isclose(basis.number_of_planewaves(0), basis.volume * (2 * basis.cutoff)**1.5 / (6 * np.pi**2), rtol=0.05)
+    coefficients = np.random.rand(3, basis.number_of_planewaves(0))
+    assert np.allclose(basis.gather(basis.scatter(coefficients, 0), 0), coefficients)
+
+
+def test_kinetic_and_hartree_operators():
+    from ocelot.wavefunction import Operator
+    operator = Operator(silicon(), energy_cutoff=8, matrix=np.diag([1, 1, 1]), gamma_centered=True)
+    coefficients = np.random.rand(3, operator.number_of_planewaves(0)) + 0j
+    assert np.allclose(operator.kinetic_operator(coefficients, 0), coefficients * operator.kinetic_energies(0))
+    # constant potential acts as identity times the constant
+    assert np.allclose(operator.local_operator(coefficients, 0, np.full(operator.fft_grid, 2.0)), 2 * coefficients)
+    # Poisson equation for a single Fourier component: V = 4 pi rho / G^2
+    grid = operator.fft_grid
+    phase = 2 * np.pi * np.arange(grid[0]) / grid[0]
+    density = np.broadcast_to(np.cos(phase)[:, np.newaxis, np.newaxis], tuple(grid))
+    g_squared = np.sum(operator.reciprocal_lattice_au()[0]**2)
+    assert np.allclose(operator.hartree_potential(density), 4 * np.pi / g_squared * density)
+
+
+def test_block_eigensolver_matches_dense_diagonalization():
+    from ocelot.wavefunction import Operator
+    operator = Operator(silicon(), energy_cutoff=5, matrix=np.diag([1, 1, 1]), gamma_centered=True)
+    grid = operator.fft_grid
+    potential = -0.5 * np.cos(2 * np.pi * np.arange(grid[0]) / grid[0])[:, np.newaxis, np.newaxis] * np.ones(tuple(grid))
+    n = operator.number_of_planewaves(0)
+    dense = operator.hamiltonian(0, potential).matmat(np.eye(n, dtype=np.complex128))
+    eigenvalues, eigenvectors = operator.solve(potential, 6)
+    assert np.allclose(eigenvalues[0], np.linalg.eigvalsh(dense)[:6], atol=1e-8)
+    # warm start from the converged vectors
+    assert np.allclose(operator.solve(potential, 6)[0], eigenvalues, atol=1e-8)
+
+
+def test_exchange_operator_and_ace():
+    from ocelot.wavefunction import Operator
+    operator = Operator(silicon(), energy_cutoff=4, matrix=np.diag([2, 2, 2]))
+    rng = np.random.default_rng(1)
+    orbitals = []
+    for k in range(len(operator.basis_kpoints)):
+        n = operator.number_of_planewaves(k)
+        q, _ = np.linalg.qr(rng.standard_normal((n, 3)) + 1j * rng.standard_normal((n, 3)))
+        orbitals.append(q.T)
+    occupations = np.full((len(orbitals), 3), 2.0)
+    exchange = operator.exchange_operator(orbitals[1], 1, orbitals, occupations)
+    assert np.allclose(exchange, operator.exchange_operator(orbitals[1], 1, orbitals, occupations, memory=1))
+    matrix = np.matmul(orbitals[1].conj(), exchange.T)
+    assert np.allclose(matrix, matrix.conj().T) and np.all(np.linalg.eigvalsh(matrix) < 0)
+    operator.build_ace(orbitals, occupations)
+    assert np.allclose(operator.ace_operator(orbitals[1], 1), exchange)
+    # a single doubly occupied orbital: exchange energy is minus half the Hartree energy
+    gamma = Operator(silicon(), energy_cutoff=4, gamma_centered=True)
+    orbital = rng.standard_normal((1, gamma.number_of_planewaves(0))) + 0j
+    orbital /= np.linalg.norm(orbital)
+    energy = np.vdot(orbital, gamma.exchange_operator(orbital, 0, [orbital], [[2.0]])).real
+    assert np.isclose(energy, -0.5 * gamma.hartree_energy(gamma.density([orbital], [[2.0]])))
+    # point group reduced k points do not cover the Brillouin zone sums
+    reduced = Operator(silicon(), energy_cutoff=4, matrix=np.diag([2, 2, 2]), symmetry=True)
+    for method in (lambda: reduced.density(orbitals, occupations),
+                   lambda: reduced.exchange_operator(orbitals[1], 1, orbitals, occupations),
+                   lambda: reduced.build_ace(orbitals, occupations)):
+        try:
+            method()
+            assert False
+        except Exception as error:
+            assert 'symmetry=False' in str(error)
+
+
+def test_ewald_madelung_and_pme():
+    from ocelot.electrostatics import Ewald
+    atoms = []
+    for corner in [[0.0, 0.0, 0.0], [0.0, 0.5, 0.5], [0.5, 0.0, 0.5], [0.5, 0.5, 0.0]]:
+        atoms.append(ocl.Atom(11, charge=1.0, coordinates=corner))
+        atoms.append(ocl.Atom(17, charge=-1.0, coordinates=list((np.array(corner) + [0.5, 0.0, 0.0]) % 1.0)))
+    rocksalt = ocl.Material(atoms, lattice_constant=5.64, bravais_vector=np.eye(3))
+    # 4 NaCl units, Madelung constant 1.747565, nearest neighbor distance a/2
+    reference = -4 * 1.7475646 * ocl.coulomb_constant / 2.82
+    for method in ['ewald', 'pme']:
+        energy, forces = Ewald(rocksalt, accuracy=1e-8, method=method).compute()
+        assert np.isclose(energy, reference, rtol=1e-6)
+        assert np.allclose(forces, 0.0, atol=1e-8)
+
+    rng = np.random.default_rng(0)
+    charges = rng.standard_normal(50)
+    arrays = ocl.AtomArrays(elements=np.ones(50, dtype=np.int64), charges=charges, coordinates=rng.random((50, 3)))
+    cell = ocl.Material(arrays, lattice_constant=1.0, bravais_vector=[[9.0, 0.0, 0.0], [1.5, 10.0, 0.0], [0.3, 0.7, 11.0]])
+    energy, forces = Ewald(cell, accuracy=1e-10).compute()
+    mesh_energy, mesh_forces = Ewald(cell, accuracy=1e-8, method='pme').compute()
+    assert np.isclose(mesh_energy, energy, rtol=1e-6)
+    assert np.allclose(mesh_forces, forces, atol=1e-5 * np.abs(forces).max())
+
+
+def test_radial_distribution():
+    from ocelot.analysis import RadialDistribution
+    atoms = [ocl.Atom(29, coordinates=corner) for corner in [[0, 0, 0], [0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0]]]
+    copper = ocl.Material(atoms, lattice_constant=3.61, bravais_vector=np.eye(3))
+    distribution = RadialDistribution(rmax=3.0, bins=300).update([copper, copper])
+    assert distribution.frames == 2
+    assert np.isclose(distribution.coordination('Cu', 'Cu')[-1], 12.0)
+    # a cell and its supercell describe the same crystal
+    cell = RadialDistribution(rmax=8.0, bins=80).update([copper])
+    supercell = RadialDistribution(rmax=8.0, bins=80).update([copper.make_supercell(np.diag([3, 3, 3]))])
+    assert np.allclose(cell.rdf(), supercell.rdf())
+    assert np.allclose(cell.rdf('Cu', 'Cu'), supercell.rdf('Cu', 'Cu'))
+    assert np.allclose(cell.coordination('Cu', 'Cu'), supercell.coordination('Cu', 'Cu'))
+    # ideal gas: g(r) ~ 1
+    rng = np.random.default_rng(0)
+    arrays = ocl.AtomArrays(elements=rng.choice([1, 8], 4000), coordinates=rng.random((4000, 3)))
+    gas = ocl.Material(arrays, lattice_constant=30.0, bravais_vector=np.eye(3))
+    distribution = RadialDistribution(rmax=6.0, bins=6).update([gas])
+    assert np.allclose(distribution.rdf(), 1.0, atol=0.1)
+    assert np.allclose(distribution.rdf('O', 'H')[1:], 1.0, atol=0.1)
+
+
+def test_radial_distribution_process_pool(tmp_path):
+    from ocelot.analysis import RadialDistribution
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'md.xyz'
+    frames = ["20\nframe\n" + "".join("H {} {} {}\n".format(*x) for x in 5 * rng.random((20, 3))) for _ in range(7)]
+    path.write_text("".join(frames))
+    trajectory = ocl.Trajectory(str(path))
+    serial = RadialDistribution(rmax=4.0, bins=40).accumulate(trajectory)
+    parallel = RadialDistribution(rmax=4.0, bins=40).accumulate(trajectory, processes=2, chunk_size=3)
+    assert parallel.frames == serial.frames == 7
+    assert np.array_equal(parallel.histograms()[(1, 1)], serial.histograms()[(1, 1)])
+    assert np.allclose(parallel.rdf(), serial.rdf())
+
+
+def test_fingerprint_index_deduplicates():
+    from ocelot.fingerprint import FingerprintIndex, fingerprint
+    benzene, ethane = read_molecule('benzene.xyz'), read_molecule('ethane.xyz')
+    rng = np.random.default_rng(0)
+    candidates = []
+    for k in range(30):
+        molecule = (benzene if k % 2 else ethane).rotate('zyx', list(360 * rng.random(3)))
+        molecule.move(rng.random(3), inplace=True)
+        molecule.coordinates = molecule.coordinates + 1e-5 * rng.standard_normal(molecule.coordinates.shape)
+        candidates.append(molecule)
+    candidates.append(ethane.copy())
+    candidates[-1].coordinates = 1.1 * candidates[-1].coordinates
+    index = FingerprintIndex(tolerance=1e-2)
+    assert index.deduplicate(candidates) == [0, 1, 30]
+    assert len(index) == 3
+    assert index.query(benzene) == [1]
+    # supercells of a crystal share the fingerprint
+    composition, vector = fingerprint(graphene())
+    supercell_composition, supercell_vector = fingerprint(graphene().make_supercell(np.diag([2, 3, 1])))
+    assert composition == supercell_composition
+    assert np.allclose(vector, supercell_vector)
+
+
+def test_batch_runner(tmp_path):
+    from ocelot.__main__ import main
+    from ocelot.batch import find_files, run_batch
+    for name in ['benzene.xyz', 'ethane.xyz', 'methane.xyz']:
+        read_molecule(name).write_xyz(str(tmp_path / name))
+    (tmp_path / 'broken.xyz').write_text('not an xyz file\n')
+    files = find_files([str(tmp_path)])
+    assert len(files) == 4
+    result = run_batch(files, str(tmp_path / 'summary.csv'), processes=2, chunk_size=1, report=None)
+    assert result['files'] == 4 and result['rows'] == 3 and len(result['errors']) == 1
+    summary = pd.read_csv(str(tmp_path / 'summary.csv')).sort_values('atoms')
+    assert summary['formula'].tolist() == ['CH4', 'C2H6', 'C6H6']
+    assert summary['bonds'].tolist() == [4, 7, 12]
+    assert main([str(tmp_path / 'ethane.xyz'), '-t', 'angles', '-o', str(tmp_path / 'angles.npz'), '--quiet']) == 0
+    with np.load(str(tmp_path / 'angles.npz')) as angles:
+        assert angles['angle'].shape == (12,)
+    # every file fails: the output still exists, with a header
+    result = run_batch([str(tmp_path / 'broken.xyz')], str(tmp_path / 'empty.csv'), processes=1, report=None)
+    assert result['rows'] == 0
+    empty = pd.read_csv(str(tmp_path / 'empty.csv'))
+    assert len(empty) == 0 and empty.columns[0] == 'filename' and 'formula' in empty.columns
+
+
+def test_import_time_budget():
+    import subprocess
+    import sys
+    script = ("import sys, time\n"
+              "start = time.perf_counter()\n"
+              "import ocelot\n"
+              "package = time.perf_counter() - start\n"
+              "molecule = ocelot.Molecule([ocelot.Atom(6), ocelot.Atom(1, coordinates=[1.0, 0.0, 0.0])])\n"
+              "print(package, time.perf_counter() - start, 'pandas' in sys.modules, 'scipy' in sys.modules)\n")
+    root = os.path.join(os.path.dirname(__file__), '..')
+    output = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True, check=True)
+    package, core, pandas, scipy = output.stdout.split()
+    assert float(package) < 0.1
+    assert float(core) < 1.0
+    assert pandas == scipy == 'False'
+
+
+def test_star_import_exports_lazy_names():
+    namespace = {}
+    exec("from ocelot import *", namespace)
+    assert namespace['Molecule'] is ocl.Molecule and namespace['Material'] is ocl.Material
+    assert namespace['element_list'][6] == 'C ' and namespace['covalent_radius'][8] == 0.66
+    assert 'symbols_to_numbers' in namespace
+
+
+def test_periodic_table_arrays_and_symbol_encoding():
+    for table in (ocl.covalent_radius, ocl.vdW_radius, ocl.atomic_mass, ocl.electronegativity):
+        assert table.shape == (119,)
+    assert ocl.covalent_radius[8] == 0.66 and ocl.atomic_mass[6] == 12.011
+    assert np.flatnonzero(np.isnan(ocl.vdW_radius[1:100])).tolist() == [60]   # Pm
+    assert np.isnan(ocl.vdW_radius[100:]).all() and ocl.vdW_radius[26] == 2.44
+    symbols = np.random.default_rng(0).choice(ocl.element_symbols[1:], 10**6)
+    numbers = ocl.symbols_to_numbers(symbols)
+    assert np.array_equal(ocl.numbers_to_symbols(numbers), symbols)
+    assert np.array_equal(ocl.symbols_to_numbers(ocl.element_list[1:]), np.arange(1, 119))
+    assert np.array_equal(ocl.symbols_to_numbers([[b'C', b'H'], [b'O ', b'Og']]), [[6, 1], [8, 118]])
+    for unknown in (['C', 'Xx'], ['Cl1'], ['c']):
+        try:
+            ocl.symbols_to_numbers(unknown)
+            assert False
+        except Exception as error:
+            assert 'Unknown chemical symbol' in str(error)